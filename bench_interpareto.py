@@ -0,0 +1,347 @@
+"""
+Benchmarks for the interpareto render pipeline.
+
+Every case runs in a fresh child process so peak RSS belongs to that case
+only. Results are appended as JSON lines (one record per case and size,
+tagged with the git commit) and two result files can be compared:
+
+    python bench_interpareto.py                          # default grid
+    python bench_interpareto.py process_df payload --rows 1e5,1e6 --cols 10,100
+    python bench_interpareto.py --full                   # 1e3..1e7 rows, 10..1000 columns
+    python bench_interpareto.py --compare before.jsonl after.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import interpareto as ipar
+from interpareto import comnt
+from interpareto.payload import dumps_binary_columns, dumps_rows
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+DEFAULT_ROWS = (1_000, 100_000)
+DEFAULT_COLS = (10, 100)
+FULL_ROWS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+FULL_COLS = (10, 100, 1000)
+MAX_CELLS = 200_000_000  # rows * cols above this are skipped (about 1.6 GB of float64)
+
+
+def timed(func, *args, repeat=3, **kwargs):
+    """Return the best wall time of several calls together with the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def synthetic_frame(rows, cols):
+    """generate_pareto_data columns, widened with smoothed Pareto columns."""
+    frame = ipar.generate_pareto_data(rows)
+    if cols <= frame.shape[1]:
+        return frame.iloc[:, :cols]
+    extra = {
+        f"smoothed_pareto_{i}": ipar.generate_smoothed_pareto_column(rows, base_high=1000 + i)
+        for i in range(cols - frame.shape[1])
+    }
+    return pd.concat([frame, pd.DataFrame(extra)], axis=1)
+
+
+def index_like_frame(rows, columns=10):
+    """Frame mixing index-like columns (checked to the last row) with random ones."""
+    data = {}
+    for i in range(columns):
+        if i % 2:
+            data[f"range_{i}"] = np.arange(rows) * (i + 1)
+        else:
+            data[f"random_{i}"] = ipar.generate_smoothed_pareto_column(rows)
+    return pd.DataFrame(data)
+
+
+def _text_size(text):
+    return len(text.encode("utf-8"))
+
+
+# Each case gets the synthetic frame and returns the callable to time, a
+# function turning its result into output bytes (or None) and the number of
+# columns it processes for the rows/s/col rate (None: all of them).
+# The detectors get the worst case instead: half of the columns are
+# arithmetic progressions, scanned to the last row.
+def case_is_index_like(frame):
+    frame = index_like_frame(*frame.shape)
+    return (lambda: [ipar.is_index_like(frame[name]) for name in frame.columns]), None, None
+
+
+def case_index_like_columns(frame):
+    frame = index_like_frame(*frame.shape)
+    return (lambda: ipar.index_like_columns(frame)), None, None
+
+
+def case_process_df(frame):
+    return (lambda: ipar.process_df(frame)), None, None
+
+
+def _processed_columns(frame, max_columns=10):
+    # render keeps the first 10 numeric columns that are not index-like
+    return ipar.process_df(frame, max_columns=max_columns)[0].shape[1]
+
+
+def case_payload(frame):
+    processed, _ = ipar.process_df(frame)
+    return (lambda: dumps_rows(processed)), _text_size, processed.shape[1]
+
+
+def case_payload_base64(frame):
+    processed, _ = ipar.process_df(frame)
+    return (lambda: dumps_binary_columns(processed)), _text_size, processed.shape[1]
+
+
+def case_payload_compact(frame):
+    processed, _ = ipar.process_df(frame)
+    compact = (lambda: dumps_binary_columns(processed, float32=True, compress=True))
+    return compact, _text_size, processed.shape[1]
+
+
+def case_comnt_render(frame):
+    processed, _ = ipar.process_df(frame)
+    values = {
+        "p_data": dumps_rows(processed),
+        "col_names": json.dumps(["index"] + processed.columns.tolist()),
+        "title": "Benchmark",
+        "warn": "",
+    }
+    with open(ipar.TEMPLATE_PATH, encoding="utf-8") as template_file:
+        template = template_file.read()
+    return (lambda: comnt.render(template, values)), _text_size, processed.shape[1]
+
+
+def case_render(frame):
+    return (lambda: ipar.render(frame, startfile=False)), _text_size, _processed_columns(frame)
+
+
+def case_render_decimated(frame):
+    return (lambda: ipar.render(frame, startfile=False, max_points=2000)), _text_size, _processed_columns(frame)
+
+
+def case_render_lazy(frame):
+    # lazy pages embed every numeric column
+    return (lambda: ipar.render(frame, startfile=False, lazy=True)), _text_size, _processed_columns(frame, None)
+
+
+def case_render_file(frame):
+    to_file = os.path.join(os.getcwd(), "bench_render.html")
+
+    def write():
+        ipar.render(frame, to_file=to_file, startfile=False)
+        return os.path.getsize(to_file)
+
+    return write, lambda size: size, _processed_columns(frame)
+
+
+def case_render_from_path(frame):
+    path = os.path.join(os.getcwd(), "bench_input.csv")
+    frame.to_csv(path, index=False)
+    render_path = (lambda: ipar.render_from_path(path, startfile=False, max_bars=1000))
+    return render_path, _text_size, _processed_columns(frame)
+
+
+def case_render_inline(frame):
+    return (lambda: ipar.render_inline(frame)), _text_size, _processed_columns(frame)
+
+
+def case_render_cached(frame):
+    # a repeated request: the frame is hashed, the page comes from memory
+    cache = ipar.RenderCache()
+    cache.render(frame)
+    # the hash reads every column
+    return (lambda: cache.render(frame)), _text_size, None
+
+
+CASES = {
+    "is_index_like": case_is_index_like,
+    "index_like_columns": case_index_like_columns,
+    "process_df": case_process_df,
+    "payload": case_payload,
+    "payload_base64": case_payload_base64,
+    "payload_compact": case_payload_compact,
+    "comnt_render": case_comnt_render,
+    "render": case_render,
+    "render_decimated": case_render_decimated,
+    "render_lazy": case_render_lazy,
+    "render_file": case_render_file,
+    "render_inline": case_render_inline,
+    "render_cached": case_render_cached,
+    "render_from_path": case_render_from_path,
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case(name, rows, cols, repeat, queue):
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            frame = synthetic_frame(rows, cols)
+            func, size_of, columns = CASES[name](frame)
+            columns = cols if columns is None else columns
+            setup_rss = _peak_rss_mb()
+            seconds, result = timed(func, repeat=repeat)
+        queue.put({
+            "seconds": seconds,
+            "processed_cols": columns,
+            "rows_per_sec_per_column": rows * columns / seconds if seconds else None,
+            "output_bytes": size_of(result) if size_of else None,
+            "setup_peak_rss_mb": setup_rss,
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+    except Exception as error:
+        queue.put({"error": repr(error)})
+
+
+def run_case(name, rows, cols, repeat=3):
+    """Run one case in a child process and return its record."""
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_run_case, args=(name, rows, cols, repeat, queue))
+    child.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except queue_module.Empty:
+            if child.is_alive():
+                continue
+            # killed (out of memory, a signal) before reporting; a record put
+            # just before exiting is still in the pipe
+            try:
+                result = queue.get(timeout=1)
+            except queue_module.Empty:
+                result = {"error": f"case process exited with code {child.exitcode}"}
+    child.join()
+    record = {"case": name, "rows": rows, "cols": cols, "repeat": repeat}
+    record.update(result)
+    return record
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def print_record(record):
+    if "error" in record:
+        print(f"{record['case']:>18} {record['rows']:>10} {record['cols']:>6}  error: {record['error']}")
+        return
+    output = record["output_bytes"]
+    output_mb = "" if output is None else f"{output / 1e6:.2f}"
+    print(
+        f"{record['case']:>18} {record['rows']:>10} {record['cols']:>6} "
+        f"{record['seconds']:>10.4f} {record['rows_per_sec_per_column'] or 0:>14,.0f} "
+        f"{record['peak_rss_mb'] or 0:>10.1f} {output_mb:>10}"
+    )
+
+
+def run(names, rows_grid, cols_grid, repeat, output, max_cells=MAX_CELLS):
+    env = environment()
+    print(
+        f"{'case':>18} {'rows':>10} {'cols':>6} {'seconds':>10} {'rows/s/col':>14} "
+        f"{'peak MB':>10} {'out MB':>10}"
+    )
+    with open(output, "a", encoding="utf8") as results_file:
+        for name in names:
+            for rows in rows_grid:
+                for cols in cols_grid:
+                    if rows * cols > max_cells:
+                        continue
+                    record = dict(env, **run_case(name, rows, cols, repeat))
+                    print_record(record)
+                    results_file.write(json.dumps(record) + "\n")
+                    results_file.flush()
+
+
+def load_results(path):
+    # Latest successful record per (case, rows, cols)
+    with open(path, encoding="utf8") as results_file:
+        records = [json.loads(line) for line in results_file if line.strip()]
+    return {(r["case"], r["rows"], r["cols"]): r for r in records if "error" not in r}
+
+
+def compare(before_path, after_path):
+    before, after = load_results(before_path), load_results(after_path)
+    print(
+        f"{'case':>18} {'rows':>10} {'cols':>6} {'before s':>10} {'after s':>10} "
+        f"{'speedup':>8} {'peak MB before -> after':>24}"
+    )
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        print(
+            f"{key[0]:>18} {key[1]:>10} {key[2]:>6} {old['seconds']:>10.4f} {new['seconds']:>10.4f} "
+            f"{old['seconds'] / new['seconds']:>7.2f}x "
+            f"{old['peak_rss_mb'] or 0:>11.1f} -> {new['peak_rss_mb'] or 0:<9.1f}"
+        )
+
+
+def _sizes(text):
+    return tuple(int(float(value)) for value in text.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="interpareto benchmarks")
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--rows", type=_sizes, default=DEFAULT_ROWS, help="comma separated, e.g. 1e3,1e5")
+    parser.add_argument("--cols", type=_sizes, default=DEFAULT_COLS, help="comma separated, e.g. 10,100")
+    parser.add_argument("--full", action="store_true", help="1e3..1e7 rows and 10..1000 columns")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cells", type=float, default=MAX_CELLS, help="skip sizes with more rows * cols")
+    parser.add_argument("--output", default="bench_results.jsonl", help="JSON lines file results are appended to")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    rows_grid, cols_grid = (FULL_ROWS, FULL_COLS) if args.full else (args.rows, args.cols)
+    run(args.cases or list(CASES), rows_grid, cols_grid, args.repeat, args.output, args.max_cells)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,8 @@
 from .interpareto import *
+from .batch import render_many
+from .cache import RenderCache
+from .profiling import Profile
+from .renderer import Renderer, render_inline_async
+from .state import ParetoState
+from .stream import render_from_path
 # from .comnt import render, write_from_template
@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Assets - the static script and style of a template as shared files
+
+With assets="shared" the inline <style> and <script> bodies of the template
+are written once to an assets directory under content-hashed names, and the
+page links to them. The template slots inside a script (col_names, p_data,
+...) move to a small inline script before it that sets them on
+window.paretoPayload, where the shared file reads them. A page is then its
+markup, the data payload and the references.
+"""
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+try:
+    from .comnt import Template
+    from .files import _atomic_write
+except ImportError:
+    from comnt import Template
+    from files import _atomic_write
+
+__all__ = ["shared_template", "write_assets", "asset_tags"]
+
+PAYLOAD = "window.paretoPayload"
+
+_INLINE = re.compile(r"<(?P<kind>script|style)>(?P<body>.*?)</(?P=kind)>", re.S)
+_JS_TAG = re.compile(r"/\*\[([\w.-]+)\*/")
+
+
+def _asset_name(kind, body):
+    extension = "js" if kind == "script" else "css"
+    return f"interpareto-{hashlib.sha256(body.encode()).hexdigest()[:16]}.{extension}"
+
+
+def _payload_script(body, names):
+    # the slots keep their default content, so unfilled slots behave as inline
+    fields = ",\n".join(
+        f"            {name}: /*[{name}*/{Template(body).content(name)}/*{name}]*/" for name in names
+    )
+    return f"<script>\n        {PAYLOAD} = {{\n{fields}\n        }};\n    </script>\n    "
+
+
+@lru_cache(maxsize=32)
+def shared_template(template):
+    """(page Template, {slot: (kind, file name, content)}) of a parsed Template.
+
+    The page has the same slots as the template plus one slot per asset,
+    filled with the tag referencing it (see asset_tags). Cached per Template.
+    """
+    parts, assets = [], {}
+    position = 0
+    for match in _INLINE.finditer(template.text):
+        kind, body = match.group("kind"), match.group("body")
+        names = _JS_TAG.findall(body) if kind == "script" else []
+        if names:
+            # the slots read the payload in the shared file
+            body = Template(body).render({name: f"{PAYLOAD}.{name}" for name in names})
+        slot = f"asset_{len(assets)}"
+        assets[slot] = (kind, _asset_name(kind, body), body)
+        parts.append(template.text[position:match.start()])
+        if names:
+            parts.append(_payload_script(match.group("body"), names))
+        parts.append(f"<!--[{slot}--><!--{slot}]-->")
+        position = match.end()
+    parts.append(template.text[position:])
+    return Template("".join(parts)), assets
+
+
+def write_assets(assets, directory):
+    """Write the asset files missing from directory (names are content hashes)."""
+    os.makedirs(directory, exist_ok=True)
+    for kind, name, body in assets.values():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            _atomic_write(path, body)
+
+
+def asset_tags(assets, url):
+    """{slot: tag} referencing every asset under url (a directory URL or path)."""
+    prefix = url.rstrip("/") + "/" if url else ""
+    return {
+        slot: f'<script src="{prefix}{name}"></script>' if kind == "script"
+        else f'<link rel="stylesheet" href="{prefix}{name}" />'
+        for slot, (kind, name, _) in assets.items()
+    }
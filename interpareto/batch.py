@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Batch - render many dashboards over a process pool
+
+Numeric columns are handed to the workers through shared memory (one block
+per frame) instead of being pickled; only the index and non-numeric columns
+go through the pipe. Each worker parses the template once (load_template
+cache) and never opens a browser.
+"""
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8, frames are pickled
+    shared_memory = None
+
+try:
+    from .interpareto import TEMPLATE_PATH, as_frame, render
+except ImportError:
+    from interpareto import TEMPLATE_PATH, as_frame, render
+
+__all__ = ["render_many"]
+
+
+def _is_shareable(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind in "iuf"
+
+
+def _share_frame(df):
+    # -> (shm or None, payload) where payload rebuilds the frame in a worker
+    positions = [i for i, dtype in enumerate(df.dtypes) if _is_shareable(dtype)]
+    if shared_memory is None or not positions or len(df) == 0:
+        return None, ("frame", df)
+
+    layout, offset = [], 0
+    for position in positions:
+        dtype = df.dtypes.iloc[position]
+        layout.append((position, dtype.str, offset))
+        offset += -(-len(df) * dtype.itemsize // 8) * 8  # keep 8 byte alignment
+    shm = shared_memory.SharedMemory(create=True, size=offset)
+    for position, dtype, start in layout:
+        target = np.ndarray(len(df), dtype=dtype, buffer=shm.buf, offset=start)
+        target[:] = df.iloc[:, position].to_numpy()
+        del target
+
+    shared = set(positions)
+    rest = df.iloc[:, [i for i in range(df.shape[1]) if i not in shared]]
+    return shm, ("shared", shm.name, layout, len(df), df.columns, rest)
+
+
+def _attach_frame(payload):
+    # -> (frame, shm or None); the shared columns are views of shm, so it
+    # stays open until the frame is no longer used
+    if payload[0] == "frame":
+        return payload[1], None
+    _, shm_name, layout, n_rows, columns, rest = payload
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared = {
+        position: np.ndarray(n_rows, dtype=dtype, buffer=shm.buf, offset=start)
+        for position, dtype, start in layout
+    }
+    rest_positions = iter(range(rest.shape[1]))
+    data = [
+        shared[position] if position in shared else rest.iloc[:, next(rest_positions)].array
+        for position in range(len(columns))
+    ]
+    # copy=False: one block per column, built on the shared buffers
+    frame = pd.DataFrame(dict(enumerate(data)), index=rest.index, copy=False)
+    frame.columns = columns
+    return frame, shm
+
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # a view of the buffer is still referenced; the mapping goes with it
+        pass
+
+
+def _render(payload, to_file, kwargs):
+    frame, shm = _attach_frame(payload)
+    try:
+        render(frame, to_file=to_file, startfile=False, **kwargs)
+    finally:
+        del frame
+        if shm is not None:
+            _close(shm)
+
+
+def _render_worker(payload, to_file, kwargs):
+    started = time.perf_counter()
+    try:
+        _render(payload, to_file, kwargs)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return time.perf_counter() - started, error
+
+
+def render_many(frames, out_dir, workers=None, templ_path=TEMPLATE_PATH, **kwargs):
+    """Render one `<name>.html` per frame in out_dir using a process pool.
+
+    frames: mapping of name -> DataFrame; other keyword arguments go to render()
+    (title defaults to the name). Returns {name: {"file", "seconds", "error"}},
+    where error is None or the formatted traceback from the worker.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    items = iter(frames.items())
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def submit_next():
+            for name, df in items:
+                to_file = os.path.join(out_dir, f"{name}.html")
+                options = dict(kwargs, templ_path=templ_path)
+                options.setdefault("title", str(name))
+                try:
+                    shm, payload = _share_frame(as_frame(df))
+                except Exception:
+                    results[name] = {"file": to_file, "seconds": None, "error": traceback.format_exc()}
+                    continue
+                try:
+                    future = executor.submit(_render_worker, payload, to_file, options)
+                except BaseException:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                    raise
+                pending[future] = (name, to_file, shm)
+                return True
+            return False
+
+        # Only a couple of frames per worker live in shared memory at a time
+        while len(pending) < 2 * workers and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, to_file, shm = pending.pop(future)
+                try:
+                    seconds, error = future.result()
+                except Exception:
+                    seconds, error = None, traceback.format_exc()
+                finally:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                results[name] = {"file": to_file, "seconds": seconds, "error": error}
+                submit_next()
+    return {name: results[name] for name in frames}
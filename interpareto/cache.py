@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Cache - memoized render/render_inline results
+
+The key is a content hash of the frame (raw column buffers for NumPy
+columns, pandas row hashes for the others, plus names, dtypes and index)
+together with the render arguments and the identity of the template (its
+file, or the text of a parsed template passed as template=).
+Pages are kept in memory up to a total size, least recently used first out,
+and optionally in a directory shared by processes or kept across restarts.
+A hit skips processing and serialization: only the frame is hashed.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .files import _atomic_write
+    from .interpareto import TEMPLATE_PATH, as_frame, render, render_inline
+    from .profiling import text_bytes
+except ImportError:
+    from files import _atomic_write
+    from interpareto import TEMPLATE_PATH, as_frame, render, render_inline
+    from profiling import text_bytes
+
+__all__ = ["RenderCache", "frame_digest"]
+
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+def _update_array(digest, values):
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iufbmM":
+        digest.update(np.ascontiguousarray(values).view("u1").data)
+    else:
+        digest.update(pd.util.hash_pandas_object(pd.Index(values), index=False).to_numpy().data)
+
+
+def frame_digest(df: pd.DataFrame):
+    """Hex digest of the frame's values, index, column names and dtypes."""
+    # sha256 runs on CPU hash instructions where available, faster than blake2b there
+    digest = hashlib.sha256()
+    index = df.index
+    digest.update(repr((df.shape, list(df.columns), [str(dtype) for dtype in df.dtypes], index.name)).encode())
+    if isinstance(index, pd.RangeIndex):
+        digest.update(repr(("range", index.start, index.stop, index.step)).encode())
+    else:
+        _update_array(digest, index.to_numpy())
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        if isinstance(column.dtype, np.dtype):
+            _update_array(digest, column.to_numpy())
+        else:
+            # extension arrays (nullable, categorical, ...) hash through pandas
+            digest.update(pd.util.hash_pandas_object(column, index=False).to_numpy().data)
+    return digest.hexdigest()[:32]
+
+
+@lru_cache(maxsize=32)
+def _text_digest(template):
+    return hashlib.sha256(template.text.encode()).hexdigest()
+
+
+def _template_identity(kwargs):
+    template = kwargs.get("template")
+    if template is not None:
+        # a parsed Template is rendered instead of templ_path: key on its text
+        return "text", _text_digest(template)
+    # same identity load_template caches on
+    path = kwargs.get("templ_path", TEMPLATE_PATH)
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+class RenderCache:
+    """LRU cache of rendered pages in front of render and render_inline.
+
+    max_bytes: memory budget for the cached pages; pages larger than that
+    are only kept on disk (if directory is set).
+    directory: optional second tier, one <key>.html file per page, not bounded.
+    Only string results are cached (to_file and profile are not accepted).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind, df, kwargs):
+        assert not kwargs.get("to_file"), "RenderCache caches strings, to_file is not supported"
+        assert not kwargs.get("profile"), "profile is not supported by RenderCache"
+        template = _template_identity(kwargs)
+        options = sorted(
+            (name, value) for name, value in kwargs.items() if name not in ("template", "templ_path")
+        )
+        arguments = repr((kind, template, options))
+        digest = hashlib.sha256(arguments.encode())
+        digest.update(frame_digest(df).encode())
+        return digest.hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".html")
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+        if self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), encoding="utf8") as page_file:
+                page = page_file.read()
+            self._remember(key, page)
+            return page
+        return None
+
+    def _remember(self, key, page):
+        size = text_bytes(page)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._pages:
+                return
+            self._pages[key] = page
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._pages.popitem(last=False)
+                self.size -= text_bytes(evicted)
+
+    def put(self, key, page):
+        self._remember(key, page)
+        if self.directory:
+            _atomic_write(self._path(key), page)
+
+    def _cached(self, kind, function, df, kwargs):
+        df = as_frame(df)
+        key = self.key(kind, df, kwargs)
+        page = self.get(key)
+        with self._lock:
+            if page is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if page is not None:
+            return page
+        page = function(df, **kwargs)
+        self.put(key, page)
+        return page
+
+    def render(self, df, **kwargs):
+        """render(df, **kwargs) as a string, from the cache when possible."""
+        return self._cached("render", render, df, dict(kwargs, to_file=None))
+
+    def render_inline(self, df, **kwargs):
+        """render_inline(df, **kwargs), from the cache when possible."""
+        return self._cached("render_inline", render_inline, df, kwargs)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self.size = 0
@@ -1,5 +1,9 @@
 #!/usr/bin/python
 # coding=utf8
+import logging
+import os
+import re
+from functools import lru_cache
 from sys import exc_info
 """
 Comnt - template content using block-annotated comments
@@ -24,6 +28,14 @@ Supported tag/comment Formats:
        const arr_to_change = [0,1]
         /*tag_name]*/
 
+Rendering the same template many times:
+    tpl = load_template("page.html")  # parsed once, cached by path and mtime
+    html = tpl.render({"title": "...", "data_arr": "[1, 2]"})
+
+    # values can also be iterables of string chunks, streamed to a file
+    with open("out.html", "w", encoding="utf8") as outfile:
+        tpl.write(outfile, {"title": "...", "data_arr": chunk_generator()})
+
 Tag Format Rules:
     - Opening tag: Comment start + '[' + tag_name + Comment continuation
     - Closing tag: Comment start + tag_name + ']' + Comment end
@@ -33,60 +45,88 @@ Author: [Tomasz Sługocki]
 Version: 0.0.1
 """
 
-__all__ = ['render', 'write_from_template', 'simple_example', 'example']
+__all__ = ['render', 'write_from_template', 'Template', 'load_template', 'simple_example', 'example']
+
+
+logger = logging.getLogger(__name__)
 
 
 class NotFoundError(Exception):
     pass
 
 
-def _render_block(text, tag_id, val=None):
-    assert isinstance(text, str) and isinstance(tag_id, str)
-    assert len(text) > len(tag_id)
+_STYLES = {"js": ("/*", "*/"), "html": ("<!--", "-->")}
 
-    assert val is None or isinstance(val, str)
 
-    def get_tags(text, tag_id, ext):
-        assert ext in ("html", "js")
-        start, end = ("/*", "*/") if ext == "js" else ("<!--", "-->")
-        start_tag_js, start_tag_html = f"/*[{tag_id}*/", f"<!--[{tag_id}-->"
-        if start_tag_js in text and start_tag_html in text:
-            raise AssertionError(f"same tag id in javascript and html is not allowed")
-        start_tag = "".join((start, "[", tag_id, end))
-        end_tag = "".join((start, tag_id, "]", end))
-        start_cnt = len(text.split(start_tag)) - 1
-        end_cnt = len(text.split(end_tag)) - 1
-        if not start_cnt and not end_cnt:
-            raise ValueError(f"not found tags {start_tag} {end_tag}, ext:{ext}")
-        if not start_cnt:
+def _tag_forms(tag_id, ext):
+    start, end = _STYLES[ext]
+    return "".join((start, "[", tag_id, end)), "".join((start, tag_id, "]", end))
+
+
+@lru_cache(maxsize=256)
+def _tags_regex(tag_ids):
+    # Longest names first, so a name that prefixes another never shadows it
+    names = "|".join(map(re.escape, sorted(tag_ids, key=len, reverse=True)))
+    return re.compile(
+        rf"/\*\[(?P<js_start>{names})\*/"
+        rf"|/\*(?P<js_end>{names})\]\*/"
+        rf"|<!--\[(?P<html_start>{names})-->"
+        rf"|<!--(?P<html_end>{names})\]-->"
+    )
+
+
+def _scan_tags(text, tag_ids):
+    # One pass over the text for all tags: {tag: {(ext, kind): [(start, end), ...]}}
+    found = {tag_id: {} for tag_id in tag_ids}
+    if not tag_ids:
+        return found
+    for match in _tags_regex(tuple(tag_ids)).finditer(text):
+        kind = match.lastgroup
+        ext, _, side = kind.partition("_")
+        found[match.group(kind)].setdefault((ext, side), []).append(match.span())
+    return found
+
+
+def _tag_span(tag_id, positions):
+    # Validates one tag's occurrences, returns the (start, end) of its content
+    if positions.get(("js", "start")) and positions.get(("html", "start")):
+        raise AssertionError(f"same tag id in javascript and html is not allowed")
+    span = None
+    errs = []
+    for ext in ["js", "html"]:
+        start_tag, end_tag = _tag_forms(tag_id, ext)
+        starts = positions.get((ext, "start"), [])
+        ends = positions.get((ext, "end"), [])
+        if not starts and not ends:
+            errs.append(repr(ValueError(f"not found tags {start_tag} {end_tag}, ext:{ext}")))
+            continue
+        if not starts:
             raise NotFoundError(f"start tag not found in form: '{start_tag}'")
-        if not end_cnt:
+        if not ends:
             raise NotFoundError(f"end tag not found in form: '{end_tag}'")
-        if start_cnt > 1:
+        if len(starts) > 1:
             raise AssertionError(f"more than one start tag: '{start_tag}'")
-        if end_cnt > 1:
+        if len(ends) > 1:
             raise AssertionError(f"more than one end tag: '{end_tag}'")
-        return start_tag, end_tag
-
-    start_tag, end_tag = None, None
-    errs = []
-    for ext in ["js", "html"]:
-        try:
-            start_tag, end_tag = get_tags(text, tag_id, ext)
-        except ValueError:
-            errs.append(repr(exc_info()[1]))
-    if not start_tag:
+        span = (starts[0][1], ends[0][0], end_tag)
+    if span is None:
         raise ValueError(f"Errors happened: {''.join(errs)}")
+    start, end, end_tag = span
+    if end < start:
+        raise AssertionError(f"end tag before start tag: '{end_tag}'")
+    return start, end
 
-    start_idx = text.find(start_tag)
-    end_idx = text.find(end_tag)
-    prefix = text[:start_idx + len(start_tag)]
-    suffix = text[end_idx:]
 
+def _render_block(text, tag_id, val=None):
+    assert isinstance(text, str) and isinstance(tag_id, str)
+    assert len(text) > len(tag_id)
+
+    assert val is None or isinstance(val, str)
+
+    start, end = _tag_span(tag_id, _scan_tags(text, (tag_id,))[tag_id])
     if val is None:  # empty strings are ok
-        old_val = text[start_idx + len(start_tag):end_idx]
-        return old_val
-    return "\n".join((prefix, val, suffix))
+        return text[start:end]
+    return "\n".join((text[:start], val, text[end:]))
 
 
 def get_tag_content(tag, instr):
@@ -94,24 +134,129 @@ def get_tag_content(tag, instr):
     return _render_block(instr, tag, None)
 
 
-def render(instr, repldict):
-    for key, val in repldict.items():
+def _outside(positions, spans):
+    return {
+        key: [tag for tag in tags if not any(s <= tag[0] and tag[1] <= e for s, e, _ in spans)]
+        for key, tags in positions.items()
+    }
+
+
+def _compile(instr, keys):
+    # Splits instr into static segments around the blocks of keys:
+    # returns (segments, slots, errors) with len(segments) == len(slots) + 1
+    spans = []
+    errors = []
+    found = _scan_tags(instr, keys)
+    for key in keys:
+        assert len(instr) > len(key)
+        # Tags inside a block replaced by an earlier key are gone, as if replaced in order
+        positions = _outside(found[key], spans) if spans else found[key]
         try:
-            instr = _render_block(instr, key, val)
+            start, end = _tag_span(key, positions)
         except ValueError:
-            print(exc_info()[1])
+            errors.append(str(exc_info()[1]))
+            continue
+        spans.append((start, end, key))
+
+    # A block nested in another replaced block is dropped
+    segments, slots = [], []
+    position, prefix = 0, ""
+    for start, end, key in sorted(spans):
+        if start < position:
+            if end > position:
+                raise AssertionError(f"overlapping tags at position {start}")
+            continue
+        segments.append(prefix + instr[position:start] + "\n")
+        slots.append(key)
+        position, prefix = end, "\n"
+    segments.append(prefix + instr[position:])
+    return segments, slots, errors
+
+
+class Template:
+    """Template parsed into static segments and named slots.
+
+    The layout for a given set of keys is computed on first use and reused,
+    so rendering is a single join of segments and values.
+    """
+
+    def __init__(self, text):
+        assert isinstance(text, str)
+        self.text = text
+        self._layouts = {}
+        self._blocks = {}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as op_file:
+            return cls(op_file.read())
+
+    def _layout(self, keys):
+        layout = self._layouts.get(keys)
+        if layout is None:
+            layout = self._layouts[keys] = _compile(self.text, keys)
+        return layout
+
+    def content(self, tag):
+        return get_tag_content(tag, self.text)
+
+    def block(self, tag):
+        """The content of tag as a Template of its own, parsed once.
+
+        Rendering it gives what get_tag_content(tag, ...) extracts from the
+        rendered page, without rendering (and scanning) the rest of the page.
+        """
+        block = self._blocks.get(tag)
+        if block is None:
+            block = self._blocks[tag] = Template(self.content(tag))
+        return block
+
+    def has_tag(self, tag):
+        return any(_scan_tags(self.text, (tag,))[tag].values())
+
+    def iter_render(self, repldict):
+        # Values are strings or iterables of string chunks (e.g. generators)
+        segments, slots, errors = self._layout(tuple(repldict))
+        for error in errors:
+            logger.warning(error)
+        yield segments[0]
+        for key, segment in zip(slots, segments[1:]):
+            val = repldict[key]
+            if isinstance(val, str):
+                yield val
+            else:
+                yield from val
+            yield segment
+
+    def render(self, repldict):
+        return "".join(self.iter_render(repldict))
+
+    def write(self, outfile, repldict):
+        # Streams to a file-like object, the full output is never held in memory
+        for piece in self.iter_render(repldict):
+            outfile.write(piece)
+
+
+@lru_cache(maxsize=32)
+def _cached_template(path, mtime_ns, size):
+    return Template.from_file(path)
+
+
+def load_template(path):
+    # Cached per path; a modified file (mtime or size) is parsed again
+    stat = os.stat(path)
+    return _cached_template(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
 
-    return instr
+
+def render(instr, repldict):
+    return Template(instr).render(repldict)
 
 
 def write_from_template(template, newfile, repldict):
     assert isinstance(repldict, dict)
     assert template != newfile
-    with open(template, encoding="utf-8") as op_file:
-        instr = op_file.read()
-    replaced = render(instr, repldict)
     with open(newfile, "w", encoding="utf8") as outfile:
-        outfile.write(replaced)
+        load_template(template).write(outfile, repldict)
     return True
 
 
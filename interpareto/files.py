@@ -0,0 +1,22 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Files - writing files other processes may be reading
+"""
+import os
+import tempfile
+
+
+def _atomic_write(path, text):
+    """Write text to path in a temporary file next to it, renamed into place.
+
+    Readers never see a partial file; with concurrent writers the last rename wins.
+    """
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf8") as output_file:
+            output_file.write(text)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
@@ -1,4 +1,5 @@
 import json
+import logging
 import os
 import subprocess
 import sys
@@ -16,107 +17,389 @@ except ImportError:
     )
 
 try:
-    from .comnt import get_tag_content
-    from .comnt import render as c_render
+    from .assets import asset_tags, shared_template, write_assets
+    from .comnt import load_template
+    from .pareto import (
+        ABC_THRESHOLDS,
+        precompute_decimated,
+        precompute_grouped,
+        precompute_pareto,
+        precompute_stats,
+        precompute_top_n,
+    )
+    from .payload import (
+        iter_binary_columns,
+        iter_json_rows,
+        iter_lazy_columns,
+        iter_lazy_index,
+        iter_pareto,
+    )
+    from .profiling import as_profile, text_bytes
 except ImportError:
-    from comnt import get_tag_content
-    from comnt import render as c_render
+    from assets import asset_tags, shared_template, write_assets
+    from comnt import load_template
+    from pareto import (
+        ABC_THRESHOLDS,
+        precompute_decimated,
+        precompute_grouped,
+        precompute_pareto,
+        precompute_stats,
+        precompute_top_n,
+    )
+    from payload import (
+        iter_binary_columns,
+        iter_json_rows,
+        iter_lazy_columns,
+        iter_lazy_index,
+        iter_pareto,
+    )
+    from profiling import as_profile, text_bytes
 
 import numpy as np
 import pandas as pd
 
-
-def is_index_like(series, tolerance=0.1):
-    # Check if series is empty
-    if len(series) == 0:
+__all__ = [
+    "TEMPLATE_FILE",
+    "TEMPLATE_PATH",
+    "index_like_columns",
+    "is_index_like",
+    "process_df",
+    "process_df_report",
+    "summarize_report",
+    "pareto_stats",
+    "generate_smoothed_pareto_column",
+    "generate_pareto_data",
+    "open_file",
+    "render",
+    "render_processed",
+    "render_inline",
+    "main",
+]
+
+INDEX_LIKE_CHUNK_ROWS = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def _index_like_steps(first_diffs, tolerance):
+    # Reference step per column: rounded when the first step is integer-like
+    rounded = np.round(first_diffs)
+    return np.where(np.abs(first_diffs - rounded) < tolerance, rounded, first_diffs)
+
+
+def _step_diffs(values, boolean=False):
+    # Same arithmetic as Series.diff: xor for booleans (|diff| of 0/1 floats,
+    # NaN for missing ones), int8/int16 are widened, other ints wrap
+    if boolean or values.dtype.kind == "b":
+        return np.abs(np.diff(values.astype("float64"), axis=0))
+    if values.dtype.kind == "i" and values.dtype.itemsize < 4:
+        values = values.astype("float32")
+    return np.diff(values, axis=0).astype("float64")
+
+
+def _steps_match(diffs, steps, tolerance):
+    # NaN diffs compare False, which also rejects columns with missing values
+    return (np.abs(diffs - steps) < tolerance).all(axis=0)
+
+
+def _index_like_block(frame, positions, tolerance, chunk_rows=INDEX_LIKE_CHUNK_ROWS):
+    # Checks step consistency for a same-dtype block of columns, reading rows
+    # in growing chunks and giving up on a column at its first violating row.
+    n_rows = len(frame)
+    positions = np.asarray(positions)
+    steps = _index_like_steps(_step_diffs(frame.iloc[:2, positions].to_numpy())[0], tolerance)
+    active = np.ones(len(positions), dtype=bool)
+    start, size = 0, 1024
+    while start < n_rows - 1 and active.any():
+        stop = min(start + size, n_rows)
+        idx = np.flatnonzero(active)
+        chunk = frame.iloc[start:stop, positions[idx]].to_numpy()
+        active[idx] = _steps_match(_step_diffs(chunk), steps[idx], tolerance)
+        start, size = stop - 1, min(size * 4, chunk_rows)
+    return active
+
+
+def _is_index_like_generic(series, tolerance):
+    # Fallback for extension and boolean dtypes
+    if series.isnull().any():
         return False
-
-    # Check if series has only one element
-    if len(series) == 1:
-        return True
-
-    # Check if all values are numeric
-    if not pd.api.types.is_numeric_dtype(series):
+    consecutive_diffs = series.diff().dropna().to_numpy(dtype="float64")
+    if len(consecutive_diffs) == 0:
         return False
+    step = _index_like_steps(consecutive_diffs[:1], tolerance)[0]
+    return bool((np.abs(consecutive_diffs - step) < tolerance).all())
+
+
+def index_like_columns(df: pd.DataFrame, tolerance=0.1):
+    """Return a boolean Series (aligned with df.columns) marking index-like columns."""
+    n_rows = len(df)
+    verdicts = np.zeros(df.shape[1], dtype=bool)
+    if n_rows == 0:
+        return pd.Series(verdicts, index=df.columns)
+    if n_rows == 1:
+        verdicts[:] = True
+        return pd.Series(verdicts, index=df.columns)
+
+    blocks = {}
+    for position, dtype in enumerate(df.dtypes):
+        if not pd.api.types.is_numeric_dtype(dtype):
+            continue
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            blocks.setdefault(dtype, []).append(position)
+        else:
+            verdicts[position] = _is_index_like_generic(df.iloc[:, position], tolerance)
 
-    # Check for NaN values
-    if series.isnull().any():
-        return False
+    for positions in blocks.values():
+        verdicts[positions] = _index_like_block(df, positions, tolerance)
+    return pd.Series(verdicts, index=df.columns)
 
-    # Calculate differences between consecutive elements
-    consecutive_diffs = series.diff().dropna()
 
-    # Check if all differences are approximately equal (consistent step)
-    if len(consecutive_diffs) > 0:
-        first_step = consecutive_diffs.iloc[0]
+def is_index_like(series, tolerance=0.1):
+    return bool(index_like_columns(series.to_frame(), tolerance).iloc[0])
+
+
+def _is_number_dtype(dtype):
+    # Same selection as select_dtypes(include="number")
+    types = pd.api.types
+    return (types.is_numeric_dtype(dtype) or types.is_timedelta64_dtype(dtype)) and not types.is_bool_dtype(dtype)
+
+
+def _string_index(index):
+    # str() of every label, vectorized for plain numeric indexes
+    if isinstance(index.dtype, np.dtype) and index.dtype.kind in "iuf":
+        return index.astype(str)
+    return index.map(lambda x: str(x))
+
+
+def _index_labels(index):
+    # the labels process_df shows: numbers become text
+    if index.dtype == "object" or pd.api.types.is_string_dtype(index):
+        return index
+    return _string_index(index)
+
+
+def as_frame(data):
+    """data as a pandas DataFrame: a DataFrame, a pyarrow Table/RecordBatch or a
+    frame with to_arrow() (polars). Optional libraries are never imported here."""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if hasattr(data, "to_arrow"):
+        data = data.to_arrow()
+    assert hasattr(data, "schema") and hasattr(data, "to_pandas"), f"unsupported input: {type(data).__name__}"
+    # one block per column: single-chunk numeric columns without nulls wrap the
+    # Arrow buffers instead of being copied; dtypes and index as to_pandas() gives
+    return data.to_pandas(split_blocks=True)
+
+
+def _column_values(df, position):
+    column = df.iloc[:, position]
+    if isinstance(column.dtype, np.dtype):
+        return column.to_numpy()  # a view for block-backed columns
+    return column.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _label_counts(codes, labels):
+    """Occurrences of every label from pd.factorize output, in order of first appearance."""
+    counts = pd.Series(np.bincount(codes, minlength=len(labels)), index=labels, name="count")
+    if not isinstance(labels, pd.MultiIndex):
+        # value_counts skips missing labels
+        counts = counts[pd.notna(labels)]
+    return counts
+
+
+def _top_labels(counts):
+    # value_counts().nlargest(3): value_counts ranks with sort_values (ties in
+    # its order, not by first appearance) and nlargest keeps that ranking
+    return counts.sort_values(ascending=False)[:3]
+
+
+class _FirstSeen:
+    """Keep-first mask of index.duplicated() over consecutive batches of labels.
+
+    count: also keep counts, label -> occurrences so far in order of first
+    appearance, starting from the given counts of earlier labels.
+    """
+
+    def __init__(self, count=False, counts=()):
+        self.counts = dict(counts) if count else None
+        self.seen = set()
+
+    def __call__(self, labels):
+        mask = np.empty(len(labels), dtype=bool)
+        counts = self.counts
+        if counts is None:
+            seen = self.seen
+            for position, label in enumerate(labels):
+                mask[position] = label not in seen
+                seen.add(label)
+            return mask
+        for position, label in enumerate(labels):
+            count = counts.get(label, 0)
+            mask[position] = not count
+            counts[label] = count + 1
+        return mask
+
+    def duplicate_counts(self, name=None):
+        """The duplicate_counts of a process_df report over all labels so far."""
+        counts = pd.Series(self.counts, name="count", dtype="int64")
+        counts.index.name = name
+        return _top_labels(counts)
+
+
+def _first_rows(codes):
+    """Keep-first mask of index.duplicated() from pd.factorize codes."""
+    # codes are numbered in order of first appearance: a row is the first of
+    # its label when its code is larger than every code before it
+    running = np.maximum.accumulate(codes)
+    first = np.empty(len(codes), dtype=bool)
+    first[:1] = True
+    first[1:] = running[1:] > running[:-1]
+    return first
+
+
+DUPLICATE_VERBS = {"first": "Dropped", "sum": "Summed", "mean": "Averaged"}
+
+
+def summarize_report(report):
+    """The processing warnings shown in the dashboard, from a process_df report."""
+    messages = [f"Dropped column '<b>{name}</b>': looks like index" for name in report["dropped_columns"]]
+    if report["duplicate_counts"] is not None:
+        verb = DUPLICATE_VERBS[report.get("duplicates", "first")]
+        messages.append(f"{verb} duplicate index: {repr(report['duplicate_counts'])}")
+    for name, looks_like_index, nan_count, negative_count, zero_count in report["columns"]:
+        if looks_like_index:
+            messages.append(f"Column '{name}': looks like index")
+        if nan_count > 0 or negative_count > 0 or zero_count > 0:
+            messages.append(
+                f"Column '<b>{name}</b>': {nan_count} NaNs, ({negative_count} negative values, {zero_count} zeros)"
+            )
+    return "</br>".join(messages) if messages else "No NaNs, negatives, or zeros found."
 
-        # For integer-like steps, use exact comparison
-        if abs(first_step - round(first_step)) < tolerance:
-            rounded_step = round(first_step)
-            step_consistency = all(abs(diff - rounded_step) < tolerance for diff in consecutive_diffs)
-        else:
-            # For floating point steps, use tolerance-based comparison
-            step_consistency = all(abs(diff - first_step) < tolerance for diff in consecutive_diffs)
 
-        return step_consistency
+def process_df(df: pd.DataFrame, max_columns=10, duplicates="first", profile=None):
+    processed_df, report = process_df_report(df, max_columns, duplicates, profile)
+    return processed_df, summarize_report(report)
 
-    return False
 
+def process_df_report(df: pd.DataFrame, max_columns=10, duplicates="first", profile=None):
+    """process_df, returning the report behind its messages instead of the text.
 
-def process_df(df: pd.DataFrame):
-    processed_df = df.copy()
+    duplicates: rows sharing an index label keep the "first" one, or are
+    aggregated into one row per label ("sum" or "mean" of every numeric column).
+    profile: a profiling.Profile that gets the index-like checks as stages.
 
-    # Check if index is already string type
-    if not (processed_df.index.dtype == "object" or pd.api.types.is_string_dtype(processed_df.index)):
-        # does not help for plotly treats numeric strings as numbers
-        processed_df.set_index(processed_df.index.map(lambda x: str(x)), inplace=True)
-
-    # processed_df.index = pd.Index([str(i) for i in processed_df.index])
-    processing_messages = []
-    for column_name in processed_df.columns:
-        column_values = processed_df[column_name]
-        print(column_name, is_index_like(column_values))
-        if is_index_like(column_values):
-            processing_messages.append(f"Dropped column '<b>{column_name}</b>': looks like index")
-            processed_df.drop(columns=[column_name], axis=1, inplace=True)
-
-    if not processed_df.index.is_unique:
-        duplicate_counts = repr(processed_df.index.value_counts().nlargest(3))
-        processing_messages.append(f"Dropped duplicate index: {duplicate_counts}")
-
-        processed_df = processed_df[~processed_df.index.duplicated(keep="first")]
-    
-    # Select numeric columns and slice first 10
-    numeric_columns = processed_df.select_dtypes(include="number")
-    # print(numeric_columns)
-    first_ten_numeric = numeric_columns.iloc[:, :10]
-
-    for column_name in first_ten_numeric.columns:
-        column_values = first_ten_numeric[column_name]
-        print(column_name, is_index_like(column_values))
-        if is_index_like(column_values):
-            print("!drop", column_name)
-            processing_messages.append(f"Column '{column_name}': looks like index")
-            first_ten_numeric.drop(columns=[column_name], axis=1, inplace=True)
-
-        nan_count = column_values.isna().sum()
-        negative_count = (column_values < 0).sum()
-        zero_count = (column_values == 0).sum()
+    report: {"index_like": {name: verdict} for every input column,
+    "dropped_columns": [name, ...], "duplicate_counts": top 3 label counts or
+    None, "duplicates": duplicates, "columns": [(name, looks_like_index, nans,
+    negatives, zeros), ...] for the numeric columns considered,
+    "rows": input rows, "kept_rows": rows of the processed frame}
+    """
+    assert duplicates in DUPLICATE_VERBS, f"unknown duplicates: {duplicates}"
+    profile = as_profile(profile)
+    df = as_frame(df)
+    # All column and row decisions are made on the input first; the result
+    # is materialized once at the end from a single row mask.
+    index = df.index
 
-        if nan_count > 0 or negative_count > 0 or zero_count > 0:
-            processing_messages.append(
-                f"Column '<b>{column_name}</b>': {nan_count} NaNs, ({negative_count} negative values, {zero_count} zeros)"
-            )
-    
-    first_ten_numeric.dropna(inplace=True)
-    first_ten_numeric = first_ten_numeric[~(first_ten_numeric == 0).any(axis=1)]
-    
-    messages_summary = (
-        "</br>".join(processing_messages)
-        if processing_messages
-        else "No NaNs, negatives, or zeros found."
+    # Check if index is already string type
+    needs_str_index = not (index.dtype == "object" or pd.api.types.is_string_dtype(index))
+    # does not help for plotly treats numeric strings as numbers
+    # unique integer labels stay unique as strings, so only kept rows are converted
+    deferred_str_index = (
+        needs_str_index
+        and isinstance(index.dtype, np.dtype)
+        and index.dtype.kind in "iu"
+        and index.is_unique
     )
-    return first_ten_numeric, messages_summary
+    if needs_str_index and not deferred_str_index:
+        index = _string_index(index)
+
+    with profile.stage("index_like", rows=len(df), columns=df.shape[1]):
+        index_like = index_like_columns(df)
+    index_like_verdicts = {
+        column_name: bool(looks_like_index) for column_name, looks_like_index in zip(df.columns, index_like)
+    }
+    dropped_columns = [column_name for column_name, looks_like_index in index_like_verdicts.items() if looks_like_index]
+    logger.debug("index-like columns: %s", index_like_verdicts)
+    n_rows = len(df)
+
+    # Numeric columns that are not index-like, first max_columns (None: all)
+    numeric_positions = [
+        position
+        for position, (dtype, looks_like_index) in enumerate(zip(df.dtypes, index_like))
+        if not looks_like_index and _is_number_dtype(dtype)
+    ][:max_columns]
+
+    unique_rows = None
+    duplicate_counts = None
+    rows_changed = False
+    if not index.is_unique:
+        # one hash pass: the label counts and the grouping come from the same codes
+        codes, labels = pd.factorize(index, use_na_sentinel=False)
+        labels = labels.set_names(index.names)
+        duplicate_counts = _top_labels(_label_counts(codes, labels))
+        if duplicates == "first":
+            unique_rows = _first_rows(codes)
+        else:
+            grouped = df.iloc[:, numeric_positions].groupby(codes, sort=False)
+            df = grouped.sum(min_count=1) if duplicates == "sum" else grouped.mean()
+            index = labels
+            df.index = index
+            numeric_positions = list(range(df.shape[1]))
+        rows_changed = True
+
+    # Surviving columns were already checked; only re-check if rows changed
+    if rows_changed:
+        rows = df.iloc[unique_rows, numeric_positions] if unique_rows is not None else df
+        with profile.stage("index_like", rows=len(rows), columns=rows.shape[1]):
+            index_like = index_like_columns(rows)
+    else:
+        index_like = [False] * len(numeric_positions)
+
+    keep_rows = np.ones(len(df), dtype=bool) if unique_rows is None else unique_rows.copy()
+    output_positions = []
+    column_reports = []
+    for position, looks_like_index in zip(numeric_positions, index_like):
+        column_name = df.columns[position]
+        if looks_like_index:
+            logger.debug("dropping column %r: looks like index after removing duplicate labels", column_name)
+
+        column_values = _column_values(df, position)
+        nan_mask = pd.isna(column_values)
+        negative_mask = column_values < 0
+        zero_mask = column_values == 0
+        if unique_rows is not None:
+            nan_mask &= unique_rows
+            negative_mask &= unique_rows
+            zero_mask &= unique_rows
+        column_reports.append((
+            column_name,
+            bool(looks_like_index),
+            np.count_nonzero(nan_mask),
+            np.count_nonzero(negative_mask),
+            np.count_nonzero(zero_mask),
+        ))
+        if not looks_like_index:
+            output_positions.append(position)
+            keep_rows &= ~(nan_mask | zero_mask)
+
+    processed_df = df.iloc[keep_rows, output_positions]
+    if deferred_str_index:
+        processed_df.index = _string_index(processed_df.index)
+    elif needs_str_index:
+        processed_df.index = index[keep_rows]
+
+    report = {
+        "index_like": index_like_verdicts,
+        "dropped_columns": dropped_columns,
+        "duplicate_counts": duplicate_counts,
+        "duplicates": duplicates,
+        "columns": column_reports,
+        "rows": n_rows,
+        "kept_rows": len(processed_df),
+    }
+    logger.debug("processed %d rows into %s, column reports: %s", n_rows, processed_df.shape, column_reports)
+    return processed_df, report
 
 
 def generate_smoothed_pareto_column(N, base_high=5000, noise=1):
@@ -159,47 +442,277 @@ def open_file(filename):
         subprocess.call([file_opener, filename])
 
 
+def _group_index(df, by):
+    # (group, label) index: duplicate labels are only looked for within a group.
+    # Built from the codes of one factorization per level; groups sorted if they can be
+    try:
+        group_codes, group_names = df[by].factorize(sort=True)
+    except TypeError:  # groups of mixed types keep the order they appear in
+        group_codes, group_names = df[by].factorize()
+    label_codes, labels = df.index.factorize()
+    index = pd.MultiIndex(
+        levels=[group_names, labels],
+        codes=[group_codes, label_codes],
+        names=[by, df.index.name],
+        verify_integrity=False,
+    )
+    frame = df.drop(columns=by)
+    frame.index = index
+    rows = group_codes >= 0
+    # rows without a group are left out
+    return frame if rows.all() else frame.iloc[rows]
+
+
+def _split_groups(processed_df):
+    """Rows ordered by group -> (frame indexed by label, group names, first row of each group + [len])."""
+    # the (group, label) index already holds both factorizations
+    index = processed_df.index.remove_unused_levels()
+    codes = index.codes[0]
+    order = np.argsort(codes, kind="stable")
+    grouped = processed_df.iloc[order]
+    # labels are converted once per distinct label
+    grouped.index = _index_labels(index.levels[1]).take(index.codes[1][order])
+    starts = np.searchsorted(codes[order], np.arange(len(index.levels[0]) + 1))
+    return grouped, index.levels[0], starts
+
+
+def _processed_stats(processed_df, thresholds, by=None):
+    if by is None:
+        return precompute_stats(processed_df, thresholds)
+    grouped, group_names, starts = _split_groups(processed_df)
+    return pd.concat(
+        [precompute_stats(grouped.iloc[start:end], thresholds) for start, end in zip(starts[:-1], starts[1:])],
+        keys=group_names,
+        names=[by, "column"],
+    )
+
+
+def pareto_stats(df, thresholds=ABC_THRESHOLDS, by=None, max_columns=None, duplicates="first"):
+    """Concentration metrics of every numeric column of df, one row per column.
+
+    Computed on what the dashboard shows: the process_df output (max_columns
+    and duplicates as in process_df, all columns by default). Columns: count,
+    total, negatives, gini, hhi and items_t, share_t, value_t for every
+    threshold t (see pareto.column_stats); with the default (80, 95), the
+    items_80 largest items are class A, the next items_95 - items_80 class B
+    and the rest class C. by: one row per group and column, as in render.
+    """
+    df = as_frame(df)
+    if by is not None:
+        df = _group_index(df, by)
+    processed_df, _ = process_df(df, max_columns=max_columns, duplicates=duplicates)
+    return _processed_stats(processed_df, thresholds, by)
+
+
+def _stats_html(stats):
+    return stats.to_html(classes="stats", border=0, na_rep="", float_format="{:,.4g}".format)
+
+
 def render(
     df,
     to_file=None,
+    *,
+    precompute=False,
+    max_bars=None,
+    max_points=None,
+    lazy=False,
+    duplicates="first",
+    profile=None,
+    by=None,
+    stats=None,
+    **options,
+):
+    """Process df and write its dashboard (see README for the arguments).
+
+    The output options (title, templ_path, startfile, precision, encoding,
+    template, assets, ...) are passed on to render_processed.
+    """
+    assert not (max_bars and max_points), "use either max_bars or max_points"
+    assert by is None or not (max_bars or max_points), "by cannot be combined with max_bars or max_points"
+    profiler = as_profile(profile)
+    df = as_frame(df)
+    if by is not None:
+        df = _group_index(df, by)
+    # lazy pages only parse the selected column, so every numeric column fits
+    with profiler.stage("process_df", rows=len(df), columns=df.shape[1]):
+        processed_df, processing_info = process_df(
+            df, max_columns=None if lazy else 10, duplicates=duplicates, profile=profiler
+        )
+
+    stats_table = None
+    if stats:
+        # over all processed rows, before max_bars/max_points keep only the drawn ones
+        with profiler.stage("stats", rows=len(processed_df), columns=processed_df.shape[1]):
+            stats_table = _processed_stats(processed_df, ABC_THRESHOLDS if stats is True else stats, by)
+
+    pareto_columns = None
+    groups = None
+    if by is not None:
+        with profiler.stage("precompute", rows=len(processed_df), columns=processed_df.shape[1]):
+            # one Pareto per group and column, the page switches between groups
+            processed_df, group_names, starts = _split_groups(processed_df)
+            pareto_columns = precompute_grouped(processed_df, starts)
+            groups = {"names": [str(name) for name in group_names], "starts": starts.tolist()}
+    elif max_bars or max_points or precompute:
+        with profiler.stage("precompute", rows=len(processed_df), columns=processed_df.shape[1]):
+            if max_bars:
+                # only rows in some column's top max_bars are embedded, the rest is summed
+                kept_rows, pareto_columns = precompute_top_n(processed_df, max_bars)
+                processed_df = processed_df.iloc[kept_rows]
+            elif max_points:
+                # full head, bucketed tail: only the rows some column draws are embedded
+                kept_rows, pareto_columns = precompute_decimated(processed_df, max_points)
+                processed_df = processed_df.iloc[kept_rows]
+            else:
+                pareto_columns = precompute_pareto(processed_df)
+
+    result = render_processed(
+        processed_df,
+        processing_info,
+        pareto_columns,
+        to_file=to_file,
+        lazy=lazy,
+        profile=profiler,
+        groups=groups,
+        stats=stats_table,
+        **options,
+    )
+    return (result, profiler) if profile is True else result
+
+
+def render_processed(
+    processed_df,
+    processing_info,
+    pareto_columns=None,
+    to_file=None,
     title="Pareto dashboard",
     templ_path=TEMPLATE_PATH,
     startfile=True,
     warnings=True,
+    precision=None,
+    encoding="json",
+    float32=False,
+    compress=False,
+    lazy=False,
+    json_rows=None,
+    profile=None,
+    block=None,
+    variables=None,
+    groups=None,
+    template=None,
+    stats=None,
+    assets="inline",
+    assets_dir=None,
+    assets_url=None,
 ):
-    processed_df, processing_info = process_df(df)
+    """Second half of render: writes a frame already returned by process_df.
+
+    pareto_columns are optional precomputed columns aligned with
+    ["index"] + processed_df.columns (see pareto.precompute_pareto).
+    json_rows can replace the JSON rows of processed_df with text serialized
+    earlier (an iterable of str, as iter_json_rows yields).
+    groups: {"names": [...], "starts": [...]} when processed_df holds one
+    group of rows after another, group i being rows starts[i]:starts[i + 1];
+    pareto_columns then hold one entry per group (see pareto.precompute_grouped).
+    stats: a pareto_stats table shown below the warnings.
+    profile, block, variables, template, assets, assets_dir, assets_url: see render.
+    """
+    profiler = as_profile(profile)
+    assert assets in ("inline", "shared"), f"unknown assets: {assets}"
+    assert encoding in ("json", "base64"), f"unknown encoding: {encoding}"
+    assert encoding == "base64" or not (float32 or compress), "float32/compress need encoding='base64'"
     column_headers = ["index"] + processed_df.columns.tolist()
-    tabular_data = [[row_index] + row_values.tolist() for row_index, row_values in processed_df.iterrows()]
 
-    data_json_string = json.dumps(tabular_data, separators=(",", ":"))
+    # generated chunk by chunk while the template is written out;
+    # precision=None keeps full float repr, an int rounds to that many decimals
+    column_blocks = None
+    if lazy:
+        # index labels up front, one block per column parsed when it is selected
+        data_json_chunks = iter_lazy_index(processed_df)
+        column_blocks = iter_lazy_columns(
+            processed_df,
+            pareto_columns,
+            precision=precision,
+            encoding=encoding,
+            float32=float32,
+            compress=compress,
+        )
+    elif encoding == "base64":
+        # one typed array per column, decoded by the template on load
+        data_json_chunks = iter_binary_columns(
+            processed_df, precision=precision, float32=float32, compress=compress
+        )
+    elif json_rows is not None:
+        data_json_chunks = json_rows
+    else:
+        data_json_chunks = iter_json_rows(processed_df, precision=precision)
     headers_json_string = json.dumps(column_headers, separators=(",", ":"))
 
     warning_info = f"<p class='warn'>{processing_info}</p>" if warnings else ""
+    if stats is not None:
+        warning_info += _stats_html(stats)
+    if profiler.in_warnings:
+        warning_info += profiler.to_html()
 
+    n_rows, n_columns = processed_df.shape
     template_variables = {
-        "p_data": data_json_string,
+        "p_data": profiler.wrap("serialize p_data", data_json_chunks, n_rows, n_columns),
         "col_names": headers_json_string,
         "title": title,
         "warn": warning_info,
         # "long_col": headers_json_string,
         # "titles": headers_json_string,
     }
-    with open(templ_path, encoding="utf-8") as template_file:
-        template_content = template_file.read()
-    
-    rendered_html = c_render(template_content, template_variables)
+    if groups is not None:
+        template_variables["p_groups"] = json.dumps(groups, separators=(",", ":"))
+    if column_blocks:
+        template_variables["p_columns"] = profiler.wrap("serialize p_columns", column_blocks, n_rows, n_columns)
+    elif pareto_columns:
+        # sort order, cumulative % and 80% cut per column, so the browser only draws
+        template_variables["p_pareto"] = profiler.wrap(
+            "serialize p_pareto", iter_pareto(pareto_columns), n_rows, n_columns
+        )
+    # parsed once per template file (re-read when the file changes)
+    with profiler.stage("load_template"):
+        if template is None:
+            template = load_template(templ_path)
+        if assets == "shared":
+            # the static script and style go to files, the slots stay in the page
+            template, shared_assets = shared_template(template)
+        if block:
+            # only the block is rendered, its sub-template is cached with the template
+            template = template.block(block)
+    extra_variables = dict(variables or {})
+    if assets == "shared":
+        # next to the report by default, referenced relative to it
+        if assets_dir is None:
+            assets_dir = os.path.join(os.path.dirname(to_file), "assets") if to_file else "assets"
+        if assets_url is None:
+            report_dir = os.path.dirname(os.path.abspath(to_file)) if to_file else os.getcwd()
+            assets_url = os.path.relpath(assets_dir, report_dir).replace(os.sep, "/")
+        with profiler.stage("write_assets"):
+            write_assets(shared_assets, assets_dir)
+        extra_variables.update(asset_tags(shared_assets, assets_url))
+    for key, value in extra_variables.items():
+        if template.has_tag(key):
+            template_variables[key] = value
     
     if not to_file:
-        return rendered_html
+        with profiler.stage("write", n_rows, n_columns) as record:
+            html = template.render(template_variables)
+            record["bytes"] = text_bytes(html)
+        return (html, profiler) if profile is True else html
     
     assert templ_path != to_file and templ_path not in to_file
-    with open(to_file, "w", encoding="utf8") as output_file:
-        output_file.write(rendered_html)
+    with profiler.stage("write", n_rows, n_columns) as record:
+        with open(to_file, "w", encoding="utf8") as output_file:
+            template.write(output_file, template_variables)
+        record["bytes"] = os.path.getsize(to_file)
     
     if startfile:
         open_file(to_file)
     
-    return output_file
+    return (output_file, profiler) if profile is True else output_file
 
 
 _render_str = partial(render, to_file=None)
@@ -207,16 +720,13 @@ _render_str = partial(render, to_file=None)
 
 def render_inline(df, **kwargs):
     if "to_file" in kwargs:
-        print(
-            f"wrong argument:[to_file] {kwargs.pop('to_file')} is not allowed in render_inline"
+        logger.warning(
+            "wrong argument:[to_file] %s is not allowed in render_inline", kwargs.pop("to_file")
         )
         # del kwargs['to_file']
     
-    inline_html = _render_str(df, **kwargs)
-    minimal_content = c_render(
-        get_tag_content("min_content", inline_html), {"render_inline": "true"}
-    )
-    return minimal_content
+    # the min_content block is rendered on its own: the payload is written once
+    return _render_str(df, block="min_content", variables={"render_inline": "true"}, **kwargs)
 
 
 def main():
@@ -0,0 +1,292 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Pareto - NumPy computations behind the dashboard
+
+Sort order, cumulative percentages and the 80% cut for every column of a
+processed frame, with the same arithmetic the template uses in JavaScript
+(stable descending sort, sequential running sum), so a precomputed chart is
+identical to one computed in the browser.
+"""
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "pareto_column",
+    "pareto_from_cumulative",
+    "precompute_pareto",
+    "precompute_grouped",
+    "top_n_column",
+    "top_n_from_head",
+    "precompute_top_n",
+    "decimate_column",
+    "precompute_decimated",
+    "column_stats",
+    "precompute_stats",
+]
+
+PARETO_THRESHOLD = 80
+# cumulative percentages closing classes A and B, C is the rest (80/15/5)
+ABC_THRESHOLDS = (80, 95)
+
+
+def descending_order(values):
+    # Stable, ties keep their original row order like Array.prototype.sort
+    return np.argsort(-values, kind="stable")
+
+
+def cut_index(cumulative_percent, threshold=PARETO_THRESHOLD):
+    """Position of the first item reaching `threshold` percent, -1 if none does."""
+    if len(cumulative_percent) == 0:
+        return -1
+    if np.all(cumulative_percent[1:] >= cumulative_percent[:-1]):
+        position = int(np.searchsorted(cumulative_percent, threshold, side="left"))
+    else:
+        # Negative values make the running total non-monotonic
+        reached = np.flatnonzero(cumulative_percent >= threshold)
+        position = int(reached[0]) if len(reached) else len(cumulative_percent)
+    if position < len(cumulative_percent) and cumulative_percent[position] >= threshold:
+        return position
+    return -1
+
+
+def pareto_column(values, threshold=PARETO_THRESHOLD):
+    """Sort order, cumulative percentages, total and threshold cut of one column."""
+    values = np.asarray(values, dtype="float64")
+    order = descending_order(values)
+    return pareto_from_cumulative(order, np.cumsum(values[order]), threshold)
+
+
+def pareto_from_cumulative(order, cumulative, threshold=PARETO_THRESHOLD):
+    """pareto_column from a descending sort order and the running sum along it."""
+    total = cumulative[-1] if len(cumulative) else 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative_percent = cumulative / total * 100
+    cut = cut_index(cumulative_percent, threshold)
+    return {
+        "order": order,
+        "cumulative": cumulative_percent,
+        "total": float(total),
+        "cut": cut,
+        "cut_percent": float(cumulative_percent[cut]) if cut >= 0 else 0.0,
+        # position of the cut among the drawn bars
+        "cut_row": cut,
+        "count": len(order),
+        "other": None,
+    }
+
+
+def precompute_pareto(df: pd.DataFrame, threshold=PARETO_THRESHOLD):
+    """Per-column Pareto arrays, aligned with ["index"] + df.columns."""
+    return [None] + [
+        pareto_column(df.iloc[:, position].to_numpy(), threshold)
+        for position in range(df.shape[1])
+    ]
+
+
+def precompute_grouped(df: pd.DataFrame, starts, threshold=PARETO_THRESHOLD):
+    """precompute_pareto of every group of rows df[starts[i]:starts[i + 1]].
+
+    Aligned with ["index"] + df.columns, each column holds one Pareto dict per
+    group with the order relative to the group's first row.
+    """
+    starts = starts.tolist() if isinstance(starts, np.ndarray) else list(starts)
+    columns = [None]
+    for position in range(df.shape[1]):
+        values = np.asarray(df.iloc[:, position].to_numpy(), dtype="float64")
+        # rows come one group after another, so sorting each group's slice gives
+        # the (group, value) lexsort order, and faster than np.lexsort does
+        columns.append([
+            pareto_column(values[start:end], threshold) for start, end in zip(starts[:-1], starts[1:])
+        ])
+    return columns
+
+
+def top_n_positions(values, n):
+    """Positions of the n largest values, in the same order a full stable sort gives."""
+    if n >= len(values):
+        return descending_order(values)
+    kth_value = values[np.argpartition(-values, n - 1)[n - 1]]
+    above = np.flatnonzero(values > kth_value)
+    # argpartition is not stable, ties at the boundary are taken by position
+    ties = np.flatnonzero(values == kth_value)[: n - len(above)]
+    head = np.sort(np.concatenate((above, ties)))
+    return head[descending_order(values[head])]
+
+
+def top_n_column(values, max_bars, threshold=PARETO_THRESHOLD):
+    """Like pareto_column, but keeps max_bars items and sums the rest into "other".
+
+    Totals and the threshold cut are still exact over all values; the cut can
+    fall inside the "other" bucket when the distribution is flat.
+    """
+    values = np.asarray(values, dtype="float64")
+    if max_bars >= len(values):
+        return pareto_column(values, threshold)
+
+    order = top_n_positions(values, max_bars)
+    tail_mask = np.ones(len(values), dtype=bool)
+    tail_mask[order] = False
+    tail = values[tail_mask]
+
+    head_cumulative = np.cumsum(values[order])
+    tail_sum = tail.sum()
+    total = head_cumulative[-1] + tail_sum
+    column = top_n_from_head(order, head_cumulative, total, len(values), tail_sum, threshold)
+    if column["cut"] < 0:
+        # Not reached in the head: only now pay for sorting the tail
+        with np.errstate(divide="ignore", invalid="ignore"):
+            full_percent = np.concatenate(
+                (head_cumulative, head_cumulative[-1] + np.cumsum(-np.sort(-tail)))
+            ) / total * 100
+        cut = cut_index(full_percent, threshold)
+        column["cut"] = cut
+        column["cut_percent"] = float(full_percent[cut]) if cut >= 0 else 0.0
+        column["cut_row"] = min(cut, len(order))
+    return column
+
+
+def top_n_from_head(order, head_cumulative, total, count, other_value, threshold=PARETO_THRESHOLD):
+    """The top_n_column result from the kept items and totals over all items.
+
+    order: positions of the kept items, largest first; head_cumulative: the
+    running sum of their values; total, count: over all items. The other
+    count - len(order) items sum to other_value and are drawn as one bar.
+    The cut is -1 when the kept items do not reach threshold; the caller
+    then looks for it among the other items.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        head_percent = head_cumulative / total * 100
+    cut = cut_index(head_percent, threshold)
+    other_count = count - len(order)
+    return {
+        "order": order,
+        # the "other" bar closes the cumulative line at 100%
+        "cumulative": np.append(head_percent, 100.0),
+        "total": float(total),
+        "cut": cut,
+        "cut_percent": float(head_percent[cut]) if cut >= 0 else 0.0,
+        # a cut past the head falls on the "other" bar
+        "cut_row": min(cut, len(order)),
+        "count": count,
+        "other": {
+            "label": f"Other ({other_count} items)",
+            "count": other_count,
+            "value": float(other_value),
+        },
+    }
+
+
+def _restrict_rows(df, columns):
+    # -> (rows, columns) with each "order" remapped to index df.iloc[rows]
+    if not columns:
+        return np.arange(len(df)), [None]
+    rows = np.unique(np.concatenate([column["order"] for column in columns]))
+    for column in columns:
+        column["order"] = np.searchsorted(rows, column["order"])
+    return rows, [None] + columns
+
+
+def precompute_top_n(df: pd.DataFrame, max_bars, threshold=PARETO_THRESHOLD):
+    """Top-N Pareto arrays for every column plus the row positions they need.
+
+    Returns (rows, columns): `rows` are the sorted positions of df rows that are
+    in the top max_bars of at least one column, and each column's "order"
+    indexes into df.iloc[rows].
+    """
+    assert max_bars > 0
+    return _restrict_rows(df, [
+        top_n_column(df.iloc[:, position].to_numpy(), max_bars, threshold)
+        for position in range(df.shape[1])
+    ])
+
+
+def decimated_positions(count, max_points, cut=-1):
+    """Sorted positions drawn out of `count` items for a budget of about max_points.
+
+    The first half of the budget keeps the head at full resolution, the tail is
+    split into equal buckets keeping their first and last item; on values sorted
+    in descending order those are each bucket's max and min. The cut is always kept.
+    """
+    if count <= max_points:
+        return np.arange(count)
+    head = max_points // 2
+    buckets = max((max_points - head) // 2, 1)
+    edges = np.linspace(head, count, buckets + 1).astype(np.int64)
+    kept = [np.arange(head), edges[:-1], edges[1:] - 1]
+    if cut >= 0:
+        kept.append([cut])
+    return np.unique(np.concatenate(kept))
+
+
+def decimate_column(values, max_points, threshold=PARETO_THRESHOLD):
+    """Like pareto_column, but draws at most about max_points bars (see decimated_positions).
+
+    Cumulative percentages, total and cut are computed over all values, so the
+    cumulative line passes through its exact values at every drawn point.
+    """
+    column = pareto_column(values, threshold)
+    kept = decimated_positions(column["count"], max_points, column["cut"])
+    column["order"] = column["order"][kept]
+    column["cumulative"] = column["cumulative"][kept]
+    if column["cut"] >= 0:
+        column["cut_row"] = int(np.searchsorted(kept, column["cut"]))
+    return column
+
+
+def precompute_decimated(df: pd.DataFrame, max_points, threshold=PARETO_THRESHOLD):
+    """Decimated Pareto arrays for every column plus the row positions they need.
+
+    Returns (rows, columns) like precompute_top_n.
+    """
+    assert max_points > 0
+    return _restrict_rows(df, [
+        decimate_column(df.iloc[:, position].to_numpy(), max_points, threshold)
+        for position in range(df.shape[1])
+    ])
+
+
+def column_stats(values, thresholds=ABC_THRESHOLDS):
+    """Concentration metrics of one column from a single sort and running sum.
+
+    gini and hhi (Herfindahl index of the shares, 1/count to 1) are NaN when
+    a value is negative. For every threshold t: items_t, the number of largest
+    items reaching t percent of the total (-1 if none does), share_t, their
+    fraction of all items, and value_t, the smallest value among them.
+    """
+    values = np.asarray(values, dtype="float64")
+    count = len(values)
+    # the values in the order of descending_order(values), same running sum as the chart
+    descending = -np.sort(-values)
+    cumulative = np.cumsum(descending)
+    total = float(cumulative[-1]) if count else 0.0
+    negatives = int(np.count_nonzero(descending < 0))
+    gini = hhi = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative_percent = cumulative / total * 100
+        if count and not negatives:
+            # 2 * area between the diagonal and the curve of the top items' share
+            gini = float(2 * cumulative.sum() / (count * total) - (count + 1) / count)
+            hhi = float(np.square(values / total).sum())
+    record = {"count": count, "total": total, "negatives": negatives, "gini": gini, "hhi": hhi}
+    for threshold in thresholds:
+        cut = cut_index(cumulative_percent, threshold)
+        name = f"{threshold:g}"
+        record["items_" + name] = cut + 1 if cut >= 0 else -1
+        record["share_" + name] = (cut + 1) / count if cut >= 0 else np.nan
+        record["value_" + name] = float(descending[cut]) if cut >= 0 else np.nan
+    return record
+
+
+def precompute_stats(df: pd.DataFrame, thresholds=ABC_THRESHOLDS):
+    """column_stats of every column, one row per column of df."""
+    thresholds = tuple(thresholds)
+    assert all(0 < threshold <= 100 for threshold in thresholds), "thresholds are percentages in (0, 100]"
+    assert list(thresholds) == sorted(set(thresholds)), "thresholds must be increasing"
+    return pd.DataFrame(
+        [column_stats(df.iloc[:, position].to_numpy(), thresholds) for position in range(df.shape[1])],
+        index=pd.Index(df.columns, name="column"),
+        columns=["count", "total", "negatives", "gini", "hhi"] + [
+            f"{kind}_{threshold:g}" for threshold in thresholds for kind in ("items", "share", "value")
+        ],
+    )
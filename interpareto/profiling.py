@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Profiling - per-stage timing of render and render_inline
+
+A Profile gets one record per pipeline stage (process_df, index-like check,
+precompute, serialization of each template slot, template write, ...): wall
+time, rows and columns handled, bytes produced and, with trace_memory=True,
+peak memory. Serialization runs while the template is written out, so the
+"serialize" records are timed inside the "write" record that contains them.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from html import escape
+
+__all__ = ["Profile"]
+
+_COLUMNS = ("stage", "seconds", "rows", "columns", "bytes", "peak_bytes")
+
+
+def text_bytes(text):
+    # UTF-8 size; isascii() is O(1) and the payload is ASCII
+    return len(text) if text.isascii() else len(text.encode("utf8"))
+
+
+def _format(key, value):
+    if value is None:
+        return ""
+    if key == "seconds":
+        return f"{value:.3f}"
+    if key in ("bytes", "peak_bytes"):
+        return f"{value:,}"
+    return str(value)
+
+
+class Profile:
+    """Stage records of render calls, in the order the stages started.
+
+    callback: called with every finished record (a dict with the keys
+    stage, seconds, rows, columns, bytes, peak_bytes), e.g. a logger method.
+    trace_memory: record the peak memory each stage allocates on top of what
+    was allocated when it started (tracemalloc, makes rendering slower).
+    in_warnings: add a table of the stages finished before the page is
+    written (processing and precompute) to the dashboard warnings.
+    """
+
+    def __init__(self, callback=None, trace_memory=False, in_warnings=False):
+        self.stages = []
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.in_warnings = in_warnings
+        self._peaks = []  # highest traced memory seen by each open stage
+        self._started_tracing = False
+
+    def _open(self, name, rows=None, columns=None):
+        record = dict.fromkeys(_COLUMNS)
+        record.update(stage=name, rows=rows, columns=columns)
+        self.stages.append(record)
+        return record
+
+    def _finish(self, record):
+        if self.callback is not None:
+            self.callback(record)
+
+    def _start_memory(self):
+        if not self.trace_memory:
+            return None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._peaks:
+            # the enclosing stage keeps its peak, reset_peak forgets it
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(current)
+        return current
+
+    def _stop_memory(self, start):
+        if start is None:
+            return None
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return peak - start
+
+    @contextmanager
+    def stage(self, name, rows=None, columns=None):
+        """Time the block; the yielded record can be filled in, e.g. with the bytes produced."""
+        record = self._open(name, rows, columns)
+        memory_start = self._start_memory()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            record["peak_bytes"] = self._stop_memory(memory_start)
+        self._finish(record)
+
+    def wrap(self, name, chunks, rows=None, columns=None):
+        """Yield the text chunks, recording the time spent producing them and their size."""
+        record = self._open(name, rows, columns)
+        record.update(seconds=0.0, bytes=0)
+        chunks = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                record["seconds"] += time.perf_counter() - started
+            record["bytes"] += text_bytes(chunk)
+            yield chunk
+        self._finish(record)
+
+    def _finished(self):
+        return [record for record in self.stages if record["seconds"] is not None]
+
+    def to_html(self):
+        """The finished stages as an HTML table."""
+        header = "".join(f"<th>{key}</th>" for key in _COLUMNS)
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{escape(_format(key, record[key]))}</td>" for key in _COLUMNS) + "</tr>"
+            for record in self._finished()
+        )
+        return f"<table class='profile'><tr>{header}</tr>{rows}</table>"
+
+    def __str__(self):
+        table = [list(_COLUMNS)] + [[_format(key, record[key]) for key in _COLUMNS] for record in self._finished()]
+        widths = [max(len(row[position]) for row in table) for position in range(len(_COLUMNS))]
+        return "\n".join(
+            "  ".join(text.ljust(width) if not position else text.rjust(width)
+                      for position, (text, width) in enumerate(zip(row, widths)))
+            for row in table
+        )
+
+
+class _NoProfile:
+    in_warnings = False
+
+    def stage(self, name, rows=None, columns=None):
+        return nullcontext({})
+
+    def wrap(self, name, chunks, rows=None, columns=None):
+        return chunks
+
+
+NO_PROFILE = _NoProfile()
+
+
+def as_profile(profile):
+    """The Profile to record into: True makes a new one, None/False records nothing."""
+    if profile is True:
+        return Profile()
+    return profile or NO_PROFILE
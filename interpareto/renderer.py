@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Renderer - render options and template set up once, for web services
+
+A Renderer holds the parsed template and default keyword arguments of
+render, and returns pages as strings. Its async methods run processing,
+precompute and serialization in an executor, so an ASGI handler can await
+them without blocking the event loop. render keeps no state between calls
+besides the parsed template caches, so concurrent calls are safe.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    from .comnt import load_template
+    from .interpareto import TEMPLATE_PATH, render, render_inline
+except ImportError:
+    from comnt import load_template
+    from interpareto import TEMPLATE_PATH, render, render_inline
+
+__all__ = ["Renderer", "render_inline_async"]
+
+
+async def _run(executor, function, df, kwargs):
+    call = partial(function, df, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def render_inline_async(df, executor=None, **kwargs):
+    """render_inline(df, **kwargs) in executor (None: the event loop's default thread pool)."""
+    return await _run(executor, render_inline, df, kwargs)
+
+
+class Renderer:
+    """render/render_inline with default options and a template parsed once.
+
+    templ_path: template file, read when the Renderer is created (and again by reload()).
+    executor: concurrent.futures executor the async methods run in; None uses
+    the event loop's default thread pool. Pure Python serialization holds the
+    GIL, a ProcessPoolExecutor renders in parallel: the frame is pickled to
+    the worker, which loads the template itself (once per process).
+    Other keyword arguments are defaults for render (title, precision,
+    encoding, ...), overridden by the arguments of each call.
+    """
+
+    def __init__(self, templ_path=TEMPLATE_PATH, executor=None, **options):
+        assert not options.get("to_file"), "Renderer returns strings, to_file is not supported"
+        self.templ_path = templ_path
+        self.executor = executor
+        self.options = options
+        self.reload()
+
+    def reload(self):
+        self.template = load_template(self.templ_path)
+
+    def _arguments(self, kwargs, shared=True):
+        options = dict(self.options, **kwargs)
+        assert not options.get("to_file"), "Renderer returns strings, to_file is not supported"
+        options.setdefault("templ_path", self.templ_path)
+        # the parsed template is passed to threads, processes use their own
+        if shared and options["templ_path"] == self.templ_path:
+            options["template"] = self.template
+        return options
+
+    def render(self, df, **kwargs):
+        """The full page as a string."""
+        return render(df, **self._arguments(kwargs))
+
+    def render_inline(self, df, **kwargs):
+        """The embeddable snippet render_inline returns."""
+        return render_inline(df, **self._arguments(kwargs))
+
+    async def _run(self, function, df, kwargs):
+        shared = not isinstance(self.executor, ProcessPoolExecutor)
+        return await _run(self.executor, function, df, self._arguments(kwargs, shared))
+
+    async def render_async(self, df, **kwargs):
+        """render() run in the executor."""
+        return await self._run(render, df, kwargs)
+
+    async def render_inline_async(self, df, **kwargs):
+        """render_inline() run in the executor."""
+        return await self._run(render_inline, df, kwargs)
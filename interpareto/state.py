@@ -0,0 +1,168 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+State - incremental dashboards for append-only data
+
+ParetoState keeps what render computes for a frame: the processed rows and
+their JSON text, and per column the descending sort order with its running
+sum. Appended rows then cost a sorted merge and their own serialization,
+instead of processing, sorting and serializing the whole history again.
+The state is plain data and can be pickled between refreshes.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from .interpareto import (
+        _column_values,
+        _FirstSeen,
+        _index_labels,
+        as_frame,
+        process_df_report,
+        render_processed,
+        summarize_report,
+    )
+    from .pareto import PARETO_THRESHOLD, descending_order, pareto_from_cumulative
+    from .payload import _common_dtype, iter_json_row_chunks
+except ImportError:
+    from interpareto import (
+        _column_values,
+        _FirstSeen,
+        _index_labels,
+        as_frame,
+        process_df_report,
+        render_processed,
+        summarize_report,
+    )
+    from pareto import PARETO_THRESHOLD, descending_order, pareto_from_cumulative
+    from payload import _common_dtype, iter_json_row_chunks
+
+__all__ = ["ParetoState"]
+
+
+def _float_column(df, position):
+    return np.asarray(df.iloc[:, position].to_numpy(), dtype="float64")
+
+
+class _SortedColumn:
+    """Descending stable sort order of one column and the running sum along it."""
+
+    def __init__(self, values):
+        self.order = descending_order(values)
+        # ascending, so searchsorted can be used directly
+        self.negated = -values[self.order]
+        self.cumulative = np.cumsum(values[self.order])
+
+    def merge(self, values, offset):
+        order = descending_order(values)
+        negated = -values[order]
+        # after equal values already there: rows appended later sort later
+        at = np.searchsorted(self.negated, negated, side="right")
+        self.negated = np.insert(self.negated, at, negated)
+        self.order = np.insert(self.order, at, offset + order)
+        if not len(at):
+            return
+        # the running sum only changes from the first insertion on; continuing
+        # it from there adds in the same sequence as a full np.cumsum
+        first = int(at[0])
+        start = self.cumulative[first - 1] if first else 0.0
+        tail = np.cumsum(np.concatenate(([start], -self.negated[first:])))[1:]
+        self.cumulative = np.concatenate((self.cumulative[:first], tail))
+
+    def pareto(self, threshold=PARETO_THRESHOLD):
+        return pareto_from_cumulative(self.order, self.cumulative, threshold)
+
+
+class ParetoState:
+    """Dashboard of a growing frame: update() merges appended rows, render() writes it.
+
+    The dashboard columns are chosen on the first frame (process_df) and stay
+    fixed. Appended rows are cleaned the same way: labels seen before are
+    dropped, and so are rows with NaN or zero in a dashboard column. Rendering
+    gives the page render(all_rows, precompute=True, precision=precision) gives.
+    """
+
+    def __init__(self, df: pd.DataFrame, precision=None, max_columns=10):
+        df = as_frame(df)
+        processed_df, report = process_df_report(df, max_columns)
+        self.precision = precision
+        self.frame = processed_df
+        self._dropped_columns = report["dropped_columns"]
+        self._column_reports = [list(column_report) for column_report in report["columns"]]
+        self._duplicate_counts = report["duplicate_counts"]
+
+        labels = _index_labels(df.index)
+        self._first_seen = _FirstSeen(count=True, counts=labels.value_counts(sort=False).items())
+        self._index_name = labels.name
+
+        self._dtype = _common_dtype(processed_df)
+        self._json_rows = list(iter_json_row_chunks(processed_df, precision, self._dtype))
+        self._columns = [
+            _SortedColumn(_float_column(processed_df, position))
+            for position in range(processed_df.shape[1])
+        ]
+
+    def update(self, df: pd.DataFrame):
+        """Merge appended rows; returns how many of them made it into the dashboard."""
+        df = as_frame(df)
+        labels = _index_labels(df.index)
+        unique = self._first_seen(labels)
+        if not unique.all():
+            self._duplicate_counts = self._first_seen.duplicate_counts(self._index_name)
+
+        keep = unique.copy()
+        for column_report in self._column_reports:
+            column_name, looks_like_index = column_report[:2]
+            values = _column_values(df, df.columns.get_loc(column_name))
+            nan_mask = pd.isna(values) & unique
+            zero_mask = (values == 0) & unique
+            column_report[2] += np.count_nonzero(nan_mask)
+            column_report[3] += np.count_nonzero((values < 0) & unique)
+            column_report[4] += np.count_nonzero(zero_mask)
+            if not looks_like_index:
+                keep &= ~(nan_mask | zero_mask)
+
+        added = df.iloc[keep, [df.columns.get_loc(name) for name in self.frame.columns]]
+        added.index = labels[keep]
+        offset = len(self.frame)
+        self.frame = pd.concat([self.frame, added])
+
+        dtype = _common_dtype(self.frame)
+        if dtype == self._dtype:
+            self._json_rows.extend(iter_json_row_chunks(added, self.precision, dtype))
+        else:
+            # e.g. floats appended to integer columns change every number's text
+            self._dtype = dtype
+            self._json_rows = list(iter_json_row_chunks(self.frame, self.precision, dtype))
+        for position, column in enumerate(self._columns):
+            column.merge(_float_column(added, position), offset)
+        return len(added)
+
+    def summary(self):
+        """The processing warnings of all rows seen so far."""
+        return summarize_report({
+            "dropped_columns": self._dropped_columns,
+            "duplicate_counts": self._duplicate_counts,
+            "columns": [tuple(column_report) for column_report in self._column_reports],
+        })
+
+    def _iter_json_rows(self):
+        yield "["
+        for position, text in enumerate(self._json_rows):
+            if position:
+                yield ","
+            yield text
+        yield "]"
+
+    def render(self, to_file=None, **kwargs):
+        """render() of all rows so far; keyword arguments as in render_processed."""
+        pareto_columns = [None] + [column.pareto() for column in self._columns]
+        return render_processed(
+            self.frame,
+            self.summary(),
+            pareto_columns,
+            to_file=to_file,
+            precision=self.precision,
+            json_rows=self._iter_json_rows(),
+            **kwargs,
+        )
@@ -0,0 +1,432 @@
+#!/usr/bin/python
+# coding=utf8
+"""
+Stream - render dashboards from files that do not fit in memory
+
+The file is read in chunks, twice. The first pass makes the column decisions
+of process_df (index-like columns, duplicate labels, NaN/negative/zero
+counts), the second keeps the top max_bars rows of every column with running
+totals. Only when a column reaches 80% past its top rows, a few histogram
+passes narrow the cut down. Memory stays proportional to the chunk size plus
+max_bars, plus the labels seen so far when an index column is given.
+
+CSV is read with pandas; Parquet and Arrow/Feather files need pyarrow.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    ipc = pq = None
+
+try:
+    from .interpareto import (
+        _FirstSeen,
+        _column_values,
+        _index_labels,
+        _index_like_steps,
+        _is_number_dtype,
+        _step_diffs,
+        _steps_match,
+    )
+    from .interpareto import render_processed, summarize_report
+    from .pareto import (
+        PARETO_THRESHOLD,
+        cut_index,
+        descending_order,
+        pareto_column,
+        top_n_from_head,
+        top_n_positions,
+    )
+except ImportError:
+    from interpareto import (
+        _FirstSeen,
+        _column_values,
+        _index_labels,
+        _index_like_steps,
+        _is_number_dtype,
+        _step_diffs,
+        _steps_match,
+    )
+    from interpareto import render_processed, summarize_report
+    from pareto import (
+        PARETO_THRESHOLD,
+        cut_index,
+        descending_order,
+        pareto_column,
+        top_n_from_head,
+        top_n_positions,
+    )
+
+__all__ = ["iter_chunks", "process_path", "render_from_path"]
+
+STREAM_CHUNK_ROWS = 1 << 18
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+CUT_BINS = 4096
+CUT_COLLECT_ROWS = 1 << 16
+
+
+def _read_frames(path, chunksize, read_kwargs):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PARQUET_EXTENSIONS:
+        assert pq is not None, "reading Parquet files needs pyarrow"
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, **read_kwargs):
+            yield batch.to_pandas()
+    elif extension in ARROW_EXTENSIONS:
+        assert ipc is not None, "reading Arrow files needs pyarrow"
+        with ipc.open_file(path) as reader:
+            for position in range(reader.num_record_batches):
+                yield reader.get_batch(position).to_pandas()
+    else:
+        with pd.read_csv(path, chunksize=chunksize, **read_kwargs) as reader:
+            yield from reader
+
+
+def iter_chunks(path, chunksize=STREAM_CHUNK_ROWS, index_col=None, read_kwargs=None):
+    """Yield DataFrame chunks of a CSV, Parquet or Arrow file.
+
+    Without index_col the index is the row number in the whole file, as if the
+    file had been read at once.
+    """
+    offset = 0
+    for frame in _read_frames(path, chunksize, read_kwargs or {}):
+        if index_col is not None:
+            frame = frame.set_index(index_col)
+        elif isinstance(frame.index, pd.RangeIndex):
+            frame.index = pd.RangeIndex(offset, offset + len(frame))
+        offset += len(frame)
+        yield frame
+
+
+class _IndexLikeState:
+    """is_index_like for one column, fed chunk by chunk.
+
+    boolean: the column holds booleans, fed as 0/1 floats (NaN for missing).
+    """
+
+    def __init__(self, tolerance, boolean=False):
+        self.tolerance = tolerance
+        self.boolean = boolean
+        self.last = None
+        self.step = None
+        self.active = True
+
+    def update(self, values):
+        if not len(values) or not self.active:
+            return
+        if self.last is not None:
+            values = np.concatenate(([self.last], values))
+        self.last = values[-1]
+        if len(values) < 2:
+            return
+        diffs = _step_diffs(values, self.boolean)
+        if self.step is None:
+            self.step = _index_like_steps(diffs[:1], self.tolerance)[0]
+        self.active = bool(_steps_match(diffs, self.step, self.tolerance))
+
+
+def _index_like_verdicts(states, n_rows):
+    # same special cases as index_like_columns
+    if n_rows == 1:
+        return [True] * len(states)
+    return [n_rows > 1 and state is not None and state.active for state in states]
+
+
+def _float_values(chunk, position):
+    values = _column_values(chunk, position)
+    if values.dtype.kind == "m":
+        return np.where(np.isnat(values), np.nan, values.view("int64"))
+    return np.asarray(values, dtype="float64")
+
+
+def _scan(path, chunksize, index_col, read_kwargs, max_columns, tolerance):
+    """First pass: the column decisions and messages of process_df."""
+    columns = None
+    numeric = None
+    raw_states = unique_states = None
+    nan_counts = negative_counts = zero_counts = None
+    first_seen = _FirstSeen(count=True) if index_col is not None else None
+    n_rows = n_unique = 0
+
+    for chunk in iter_chunks(path, chunksize, index_col, read_kwargs):
+        if columns is None:
+            columns = chunk.columns
+            numeric = [True] * len(columns)
+            boolean = [pd.api.types.is_bool_dtype(dtype) for dtype in chunk.dtypes]
+            raw_states = [_IndexLikeState(tolerance, flag) for flag in boolean]
+            unique_states = [_IndexLikeState(tolerance, flag) for flag in boolean]
+            nan_counts, negative_counts, zero_counts = ([0] * len(columns) for _ in range(3))
+        assert chunk.columns.equals(columns), "all chunks must have the same columns"
+        unique = first_seen(_index_labels(chunk.index)) if first_seen else np.ones(len(chunk), dtype=bool)
+        n_rows += len(chunk)
+        n_unique += np.count_nonzero(unique)
+
+        for position, dtype in enumerate(chunk.dtypes):
+            numeric[position] = numeric[position] and _is_number_dtype(dtype)
+            if not pd.api.types.is_numeric_dtype(dtype):
+                raw_states[position] = unique_states[position] = None
+            if raw_states[position] is None:
+                continue
+            values = _float_values(chunk, position)
+            raw_states[position].update(values)
+            values = values[unique]
+            unique_states[position].update(values)
+            nan_counts[position] += np.count_nonzero(np.isnan(values))
+            negative_counts[position] += np.count_nonzero(values < 0)
+            zero_counts[position] += np.count_nonzero(values == 0)
+
+    assert columns is not None, f"no rows in {path}"
+    dropped = _index_like_verdicts(raw_states, n_rows)
+
+    duplicate_counts = None
+    has_duplicates = n_unique < n_rows
+    if has_duplicates:
+        duplicate_counts = first_seen.duplicate_counts(index_col)
+
+    numeric_positions = [
+        position
+        for position, (is_numeric, looks_like_index) in enumerate(zip(numeric, dropped))
+        if is_numeric and not looks_like_index
+    ][:max_columns]
+    if has_duplicates:
+        index_like = _index_like_verdicts([unique_states[p] for p in numeric_positions], n_unique)
+    else:
+        index_like = [False] * len(numeric_positions)
+
+    report = {
+        "dropped_columns": [name for name, looks_like_index in zip(columns, dropped) if looks_like_index],
+        "duplicate_counts": duplicate_counts,
+        "columns": [
+            (columns[p], looks_like_index, nan_counts[p], negative_counts[p], zero_counts[p])
+            for p, looks_like_index in zip(numeric_positions, index_like)
+        ],
+    }
+    output_positions = [p for p, looks_like_index in zip(numeric_positions, index_like) if not looks_like_index]
+    return [columns[position] for position in output_positions], summarize_report(report)
+
+
+def _iter_kept(path, chunksize, index_col, read_kwargs, output_columns):
+    """Chunks of the rows process_df keeps, restricted to the output columns."""
+    # labels are compared as shown, but only converted to text for the kept rows
+    first_seen = _FirstSeen() if index_col is not None else None
+    for chunk in iter_chunks(path, chunksize, index_col, read_kwargs):
+        keep = first_seen(_index_labels(chunk.index)) if first_seen else np.ones(len(chunk), dtype=bool)
+        chunk = chunk.loc[:, output_columns]
+        for position in range(chunk.shape[1]):
+            values = _float_values(chunk, position)
+            keep &= ~(np.isnan(values) | (values == 0))
+        yield chunk.iloc[keep]
+
+
+class _TopRows:
+    """Top max_bars rows of one column plus running totals over all of them."""
+
+    def __init__(self, max_bars):
+        self.max_bars = max_bars
+        self.rows = None  # top rows, in file order
+        self.ordinals = np.empty(0, dtype=np.int64)  # their positions among the kept rows
+        self.count = 0
+        self.total = 0.0
+        self.positive_min = np.inf
+        self.positive_max = -np.inf
+
+    def update(self, chunk, position, offset):
+        values = _float_values(chunk, position)
+        self.count += len(values)
+        self.total += values.sum()
+        positive = values[values > 0]
+        if len(positive):
+            self.positive_min = min(self.positive_min, positive.min())
+            self.positive_max = max(self.positive_max, positive.max())
+
+        best = np.sort(top_n_positions(values, self.max_bars))
+        candidates = chunk.iloc[best]
+        ordinals = offset + best
+        if self.rows is not None:
+            candidates = pd.concat([self.rows, candidates])
+            ordinals = np.concatenate((self.ordinals, ordinals))
+        # file order is kept, so ties are still taken by position
+        best = np.sort(top_n_positions(_float_values(candidates, position), self.max_bars))
+        self.rows = candidates.iloc[best]
+        self.ordinals = ordinals[best]
+
+
+def _geometric_bins(values, edges):
+    # searchsorted(edges, values, "right") - 1 for geometric edges, from logarithms
+    last = len(edges) - 2
+    if last < 1:
+        return np.zeros(len(values), dtype=np.intp)
+    ratio = np.log(edges[-1] / edges[0]) / (last + 1)
+    bins = np.clip((np.log(values / edges[0]) / ratio).astype(np.intp), 0, last)
+    # rounding can land one bin off next to an edge
+    bins -= (bins > 0) & (values < edges[bins])
+    bins += (bins < last) & (values >= edges[bins + 1])
+    if ((values < edges[bins]) | ((bins < last) & (values >= edges[bins + 1]))).any():
+        # edges merged by rounding in a very narrow range are no longer geometric
+        bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, last)
+    return bins
+
+
+def _tail_cuts(path, chunksize, index_col, read_kwargs, output_columns, targets, threshold):
+    """Cut (position, percent) of columns whose threshold lies past their top rows.
+
+    targets: {column position: _TopRows}. Every pass bins the positive values in
+    a shrinking [low, high) range; once the bin holding the cut is small enough,
+    its values are collected and sorted. Negative values come last in the
+    descending order, so the cut is always among the positive ones.
+    """
+    cuts = {position: (-1, 0.0) for position in targets}
+    ranges = {
+        position: {
+            "low": top.positive_min,
+            "high": np.nextafter(top.positive_max, np.inf),
+            "above_sum": 0.0,
+            "above_count": 0,
+            "size": top.count,
+        }
+        for position, top in targets.items()
+        if top.total > 0 and np.isfinite(top.positive_max)
+    }
+
+    def in_range(chunk, position):
+        values = _float_values(chunk, position)
+        r = ranges[position]
+        return values[(values >= r["low"]) & (values < r["high"])]
+
+    narrowing = [p for p, r in ranges.items() if r["size"] > CUT_COLLECT_ROWS]
+    while narrowing:
+        edges = {p: np.unique(np.geomspace(ranges[p]["low"], ranges[p]["high"], CUT_BINS + 1)) for p in narrowing}
+        sums = {p: np.zeros(len(edges[p]) - 1) for p in narrowing}
+        counts = {p: np.zeros(len(edges[p]) - 1, dtype=np.int64) for p in narrowing}
+        for chunk in _iter_kept(path, chunksize, index_col, read_kwargs, output_columns):
+            for p in narrowing:
+                values = in_range(chunk, p)
+                bins = _geometric_bins(values, edges[p])
+                sums[p] += np.bincount(bins, weights=values, minlength=len(sums[p]))
+                counts[p] += np.bincount(bins, minlength=len(counts[p]))
+
+        for p in narrowing:
+            r, total = ranges[p], targets[p].total
+            # running sums from the largest bin down, first bin reaching the threshold
+            reached = (r["above_sum"] + np.cumsum(sums[p][::-1])) / total * 100 >= threshold
+            if not reached.any():
+                del ranges[p]
+                continue
+            j = len(sums[p]) - 1 - int(np.argmax(reached))
+            if (edges[p][j], edges[p][j + 1]) == (r["low"], r["high"]):
+                # no float left in between to split on, collect what is there
+                r["size"] = 0
+                continue
+            r["above_sum"] += sums[p][j + 1:].sum()
+            r["above_count"] += int(counts[p][j + 1:].sum())
+            r["low"], r["high"], r["size"] = edges[p][j], edges[p][j + 1], int(counts[p][j])
+        narrowing = [p for p in narrowing if p in ranges and ranges[p]["size"] > CUT_COLLECT_ROWS]
+
+    collected = {position: [] for position in ranges}
+    if collected:
+        for chunk in _iter_kept(path, chunksize, index_col, read_kwargs, output_columns):
+            for position in collected:
+                collected[position].append(in_range(chunk, position))
+    for position, parts in collected.items():
+        r, total = ranges[position], targets[position].total
+        values = -np.sort(-np.concatenate(parts))
+        percent = (r["above_sum"] + np.cumsum(values)) / total * 100
+        cut = cut_index(percent, threshold)
+        if cut >= 0:
+            cuts[position] = (r["above_count"] + cut, float(percent[cut]))
+    return cuts
+
+
+def process_path(
+    path,
+    max_bars=1000,
+    chunksize=STREAM_CHUNK_ROWS,
+    index_col=None,
+    read_kwargs=None,
+    max_columns=10,
+    tolerance=0.1,
+    threshold=PARETO_THRESHOLD,
+):
+    """Out-of-core process_df + pareto.precompute_top_n.
+
+    Returns (processed_df, processing_info, pareto_columns) where processed_df
+    holds only the rows in the top max_bars of some column.
+    """
+    assert max_bars > 0
+    output_columns, processing_info = _scan(path, chunksize, index_col, read_kwargs, max_columns, tolerance)
+
+    tops = [_TopRows(max_bars) for _ in output_columns]
+    offset = 0
+    for chunk in _iter_kept(path, chunksize, index_col, read_kwargs, output_columns):
+        for position, top in enumerate(tops):
+            top.update(chunk, position, offset)
+        offset += len(chunk)
+
+    if not output_columns or not offset:
+        empty = pd.DataFrame(columns=output_columns, dtype="float64")
+        return empty, processing_info, [None] + [pareto_column([]) for _ in output_columns]
+
+    ordinals, first = np.unique(np.concatenate([top.ordinals for top in tops]), return_index=True)
+    processed_df = pd.concat([top.rows for top in tops]).iloc[first]
+    processed_df.index = _index_labels(processed_df.index)
+
+    columns, tail_targets = [], {}
+    for position, top in enumerate(tops):
+        rows = np.searchsorted(ordinals, top.ordinals)
+        values = _float_values(top.rows, position)
+        if top.count <= max_bars:
+            # every kept row is in the top rows: the exact in-memory computation
+            column = pareto_column(values, threshold)
+            column["order"] = rows[column["order"]]
+            columns.append(column)
+            continue
+        order = descending_order(values)
+        head_cumulative = np.cumsum(values[order])
+        column = top_n_from_head(
+            rows[order], head_cumulative, top.total, top.count, top.total - head_cumulative[-1], threshold
+        )
+        columns.append(column)
+        if column["cut"] < 0:
+            tail_targets[position] = top
+
+    if tail_targets:
+        cuts = _tail_cuts(path, chunksize, index_col, read_kwargs, output_columns, tail_targets, threshold)
+        for position, (cut, cut_percent) in cuts.items():
+            column = columns[position]
+            column["cut"], column["cut_percent"] = cut, cut_percent
+            column["cut_row"] = len(column["order"]) if cut >= 0 else -1
+    return processed_df, processing_info, [None] + columns
+
+
+def render_from_path(
+    path,
+    to_file=None,
+    max_bars=1000,
+    chunksize=STREAM_CHUNK_ROWS,
+    index_col=None,
+    read_kwargs=None,
+    lazy=False,
+    **kwargs,
+):
+    """render() for a CSV, Parquet or Arrow file read chunk by chunk.
+
+    The dashboard is the one render(df, max_bars=max_bars) gives for the whole
+    file. read_kwargs go to pandas.read_csv (or ParquetFile.iter_batches), other
+    keyword arguments to render (title, startfile, precision, encoding, ...).
+    """
+    processed_df, processing_info, pareto_columns = process_path(
+        path,
+        max_bars=max_bars,
+        chunksize=chunksize,
+        index_col=index_col,
+        read_kwargs=read_kwargs,
+        max_columns=None if lazy else 10,
+    )
+    return render_processed(
+        processed_df, processing_info, pareto_columns, to_file=to_file, lazy=lazy, **kwargs
+    )